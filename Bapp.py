@@ -1,16 +1,85 @@
 import tkinter as tk
+import os
+import queue
+import threading
+from collections import OrderedDict
 from tkinter import ttk
 from assets.estilos.splash import SplashScreen
 from assets.estilos.styles import Styles
-from modules.diario import DiarioApp
-from modules.gimnasio import GimnasioApp
-from modules.mochila import MochilaApp
+from modules.persistencia import cola_guardado
+from modules.instrumentacion import obtener_logger
+
+log = obtener_logger("principal")
+
+# Ventanas de módulos que se conservan ocultas al cerrarlas (0 = destruirlas siempre)
+MAX_VENTANAS_EN_MEMORIA = 2
+
+RUTA_GIMNASIO = os.path.join("Registros", "Gimnasio")
+RUTA_PESO = os.path.join("Registros", "Peso")
+INTERVALO_PRECARGA = 100  # ms entre revisiones de la precarga en segundo plano
+
+
+def precargar_modulos():
+    """Importa los módulos de la aplicación para que abrirlos no espere al disco"""
+    import modules.diario
+    import modules.mochila
+    import modules.gimnasio
+
+
+def cargar_indices():
+    """Carga los índices de búsqueda y crea (vacíos) los del gimnasio"""
+    from modules.busqueda import IndiceInvertido
+    from modules.diario import RUTA_INDICE_BUSQUEDA
+    from modules.mochila import SEARCH_INDEX_PATH
+    from modules.datos_gimnasio import IndiceEntrenamientos, BitacoraPeso
+
+    IndiceInvertido.compartido(RUTA_INDICE_BUSQUEDA)
+    IndiceInvertido.compartido(SEARCH_INDEX_PATH)
+    # Se crean ya para que la precarga y la ventana del gimnasio usen las mismas
+    # (las fábricas tienen bloqueo: el splash puede cerrarse antes de terminar)
+    IndiceEntrenamientos.compartido(RUTA_GIMNASIO)
+    BitacoraPeso.compartida(RUTA_PESO)
+
+
+def leer_historial_gimnasio():
+    """Lee los entrenamientos y pesajes nuevos; devuelve cómo aplicarlos al índice en el hilo de Tk"""
+    from modules.datos_gimnasio import IndiceEntrenamientos, BitacoraPeso
+
+    BitacoraPeso.compartida(RUTA_PESO).cargar()
+    indice = IndiceEntrenamientos.compartido(RUTA_GIMNASIO)
+    cambios = indice.leer_cambios()
+    return lambda: indice.aplicar_cambios(cambios)
+
+
+def precargar_graficas():
+    """Importa matplotlib y su backend de Tk (lo más lento de abrir el gimnasio)"""
+    try:
+        import matplotlib.pyplot
+        import matplotlib.backends.backend_tkagg
+    except ImportError as e:
+        log.warning("matplotlib no está disponible: %s", e)
+
+
+# (descripción, función, en hilo secundario): se ejecutan mientras se muestra el splash
+TAREAS_DE_ARRANQUE = [
+    ("Aplicando estilos", Styles.apply_styles, False),
+    ("Cargando módulos", precargar_modulos, True),
+    ("Cargando registros", cargar_indices, True),
+]
+
+# (descripción, función): se ejecutan en un hilo con el menú ya visible. Si la
+# función devuelve otra, esta se ejecuta después en el hilo de Tk.
+TAREAS_EN_SEGUNDO_PLANO = [
+    ("Historial del gimnasio", leer_historial_gimnasio),
+    ("Gráficas", precargar_graficas),
+]
 
 class MainApp:
     def __init__(self, root):
         self.root = root
         self.root.title("Mi Aplicación Personal")
         self.ventana_secundaria_abierta = False
+        self.ventanas = OrderedDict()  # título -> (ventana, aplicación), de la menos a la más reciente
         
         self.root.protocol("WM_DELETE_WINDOW", self.exit_app)  # Manejo de cierre de ventana
         
@@ -41,6 +110,41 @@ class MainApp:
         """Finaliza la configuración después de que la ventana esté lista"""
         # Para añadir aquí cualquier inicialización que necesite la ventana visible
         self.root.focus_force()
+        self.precargar_en_segundo_plano(TAREAS_EN_SEGUNDO_PLANO)
+
+    def precargar_en_segundo_plano(self, tareas):
+        """Ejecuta las tareas de precarga en un hilo sin bloquear el menú"""
+        resultados = queue.Queue()
+
+        def trabajar():
+            for descripcion, funcion in tareas:
+                try:
+                    aplicar = funcion()
+                except Exception:
+                    log.exception("Falló la precarga: %s", descripcion)
+                    continue
+                if callable(aplicar):
+                    resultados.put((descripcion, aplicar))
+            resultados.put(None)
+
+        threading.Thread(target=trabajar, daemon=True).start()
+        self.root.after(INTERVALO_PRECARGA, self.revisar_precarga, resultados)
+
+    def revisar_precarga(self, resultados):
+        """Aplica en el hilo de Tk lo que la precarga dejó listo"""
+        while True:
+            try:
+                elemento = resultados.get_nowait()
+            except queue.Empty:
+                self.root.after(INTERVALO_PRECARGA, self.revisar_precarga, resultados)
+                return
+            if elemento is None:
+                return
+            descripcion, aplicar = elemento
+            try:
+                aplicar()
+            except Exception:
+                log.exception("Falló la precarga: %s", descripcion)
     
     def center_window(self, width, height):
         """Centra la ventana en la pantalla"""
@@ -120,7 +224,7 @@ class MainApp:
             self.main_frame,
             text="🚪 Salir",
             style="Custom.TButton",
-            command=self.root.quit,
+            command=self.exit_app,
             width=19,
             padding=(50, 20)
         )
@@ -134,6 +238,15 @@ class MainApp:
         self.ventana_secundaria_abierta = True
         self.root.withdraw()  # Oculta la ventana principal
         
+        # Ventana conservada de una apertura anterior: se muestra tal como quedó
+        if titulo in self.ventanas:
+            self.ventanas.move_to_end(titulo)
+            secundaria, _ = self.ventanas[titulo]
+            secundaria.deiconify()
+            secundaria.state("zoomed")
+            secundaria.focus_force()
+            return secundaria
+        
         # Crear ventana secundaria
         secundaria = tk.Toplevel()
         secundaria.title(titulo)
@@ -144,32 +257,25 @@ class MainApp:
         
         # Configurar cierre seguro
         secundaria.protocol("WM_DELETE_WINDOW", 
-                          lambda: self.cerrar_ventana_secundaria(secundaria))
+                          lambda: self.cerrar_ventana_secundaria(titulo))
         
-        # Instanciar la aplicación secundaria
+        # Instanciar la aplicación secundaria y guardar referencia
         app_instance = app_class(secundaria)
-        
-        # Guardar referencia
-        setattr(self, f'app_{titulo.lower().replace(" ", "_")}', app_instance)
-        setattr(self, f'ventana_{titulo.lower().replace(" ", "_")}', secundaria)
+        self.ventanas[titulo] = (secundaria, app_instance)
         
         return secundaria
 
-    def cerrar_ventana_secundaria(self, ventana):
-        """Cierra la ventana secundaria y muestra la principal"""
-        # Obtener la instancia asociada
-        ventana_nombre = [attr for attr in dir(self) if getattr(self, attr) == ventana]
-        if ventana_nombre:
-            app_instance = getattr(self, f'app_{ventana_nombre[0][8:]}', None)
-            if app_instance and hasattr(app_instance, 'cleanup'):
-                app_instance.cleanup()  # Llama al método de limpieza específico
-
-            # Eliminar referencias a la aplicación y ventana secundaria
-            setattr(self, f'app_{ventana_nombre[0][8:]}', None)
-            setattr(self, ventana_nombre[0], None)
-
-        # Destruir la ventana secundaria
-        ventana.destroy()
+    def cerrar_ventana_secundaria(self, titulo):
+        """Oculta (o destruye) la ventana secundaria y muestra la principal"""
+        secundaria, app_instance = self.ventanas[titulo]
+        if MAX_VENTANAS_EN_MEMORIA > 0:
+            # Se conserva oculta para reabrirla al instante
+            if hasattr(app_instance, 'al_ocultar'):
+                app_instance.al_ocultar()
+            secundaria.withdraw()
+            self.liberar_ventanas(MAX_VENTANAS_EN_MEMORIA)
+        else:
+            self.destruir_ventana(titulo)
 
         # Mostrar la ventana principal
         self.root.deiconify()
@@ -178,17 +284,33 @@ class MainApp:
         # Enfocar la ventana principal
         self.root.focus_force()
 
+    def liberar_ventanas(self, limite):
+        """Destruye las ventanas usadas hace más tiempo hasta dejar como mucho `limite`"""
+        while len(self.ventanas) > limite:
+            self.destruir_ventana(next(iter(self.ventanas)))
+
+    def destruir_ventana(self, titulo):
+        """Llama al cleanup de la aplicación y destruye su ventana"""
+        secundaria, app_instance = self.ventanas.pop(titulo)
+        if hasattr(app_instance, 'cleanup'):
+            app_instance.cleanup()  # Llama al método de limpieza específico
+        if secundaria.winfo_exists():
+            secundaria.destroy()
+
 
     def abrir_diario(self):
         """Abre la ventana del diario"""
+        from modules.diario import DiarioApp  # Cada módulo se importa al abrirlo por primera vez
         self.abrir_ventana_secundaria("Diario Personal", DiarioApp)
 
     def abrir_mochila(self):
         """Abre la ventana de la mochila"""
+        from modules.mochila import MochilaApp
         self.abrir_ventana_secundaria("Mochila", MochilaApp)
 
     def abrir_gimnasio(self):
         """Abre la ventana del gimnasio"""
+        from modules.gimnasio import GimnasioApp
         self.abrir_ventana_secundaria("Registro de Gimnasio", GimnasioApp)
 
     def toggle_maximize(self, event=None):
@@ -203,25 +325,16 @@ class MainApp:
     def exit_app(self, event=None):
         """Salir de la aplicación cerrando ventanas secundarias y la principal"""
         try:
-            # Cerrar todas las ventanas secundarias si existen
-            for attr in dir(self):
-                if attr.startswith('ventana_'):
-                    ventana = getattr(self, attr)
-                    if isinstance(ventana, tk.Toplevel) and ventana.winfo_exists():
-                        # Llamar al método de limpieza si está definido
-                        app_instance = getattr(self, f'app_{attr[8:]}', None)
-                        if app_instance and hasattr(app_instance, 'cleanup'):
-                            app_instance.cleanup()
-
-                        # Destruir la ventana y eliminar referencias
-                        ventana.destroy()
-                        setattr(self, f'app_{attr[8:]}', None)
-                        setattr(self, attr, None)
+            # Cerrar todas las ventanas secundarias, visibles u ocultas
+            self.liberar_ventanas(0)
+
+            # Terminar las escrituras pendientes (incluidas las de cada cleanup)
+            cola_guardado.vaciar()
 
             # Cerrar la ventana principal
             self.root.quit()
         except Exception as e:
-            print(f"Error al cerrar la aplicación: {e}")
+            log.exception("Error al cerrar la aplicación: %s", e)
         return "break"
 
 
@@ -235,11 +348,11 @@ def main():
             root.after(100, lambda: root.deiconify()) 
             app = MainApp(root)
         except Exception as e:
-            print(f"Error al iniciar la aplicación: {e}")
+            log.exception("Error al iniciar la aplicación: %s", e)
             root.destroy()
     
     # Mostrar splash screen
-    splash = SplashScreen(root, on_complete=start_main_app)
+    splash = SplashScreen(root, on_complete=start_main_app, tareas=TAREAS_DE_ARRANQUE)
     
     root.mainloop()
 
@@ -0,0 +1,128 @@
+import os
+import sys
+import json
+import hashlib
+import tkinter as tk
+from assets.estilos.styles import get_resource_path
+
+# Versiones ya escaladas de logos e iconos, junto a los datos del usuario
+RUTA_CACHE_IMAGENES = os.path.join("Registros", ".cache", "imagenes")
+# Huella de cada original junto a su (mtime_ns, tamaño), para no releerlo en cada arranque
+ARCHIVO_HUELLAS = os.path.join(RUTA_CACHE_IMAGENES, "huellas.json")
+
+_imagenes = {}  # (intérprete de Tk, nombre en la caché) -> PhotoImage ya creada
+_huellas = None  # ruta del original (relativa a los recursos) -> [mtime_ns, tamaño, huella]
+
+
+def _cargar_huellas():
+    """Lee las huellas guardadas (una sola vez por proceso)"""
+    global _huellas
+    if _huellas is None:
+        try:
+            with open(ARCHIVO_HUELLAS, encoding="utf-8") as f:
+                _huellas = json.load(f)
+        except (OSError, ValueError):
+            _huellas = {}
+    return _huellas
+
+
+def _ruta_de_clave(clave):
+    return clave if os.path.isabs(clave) else get_resource_path(clave)
+
+
+def _clave_y_firma(ruta):
+    """Clave del original en huellas.json y su firma [mtime_ns, tamaño]
+
+    Los recursos se guardan relativos a la carpeta de recursos, que en el
+    ejecutable de un solo archivo es una carpeta temporal nueva en cada
+    arranque. Allí los archivos se extraen de nuevo cada vez, así que su fecha
+    es la del ejecutable: solo cambia al instalar otra versión.
+    """
+    ruta = os.path.abspath(ruta)
+    base = os.path.normpath(get_resource_path(""))
+    stat = os.stat(ruta)
+    try:
+        fuera = os.path.commonpath([ruta, base]) != base
+    except ValueError:
+        fuera = True  # Otra unidad en Windows
+    if fuera:
+        return ruta, [stat.st_mtime_ns, stat.st_size]
+    clave = os.path.relpath(ruta, base).replace(os.sep, "/")
+    if getattr(sys, 'frozen', False):
+        return clave, [os.stat(sys.executable).st_mtime_ns, stat.st_size]
+    return clave, [stat.st_mtime_ns, stat.st_size]
+
+
+def _guardar_huellas():
+    """Escribe las huellas (sin las de originales que ya no existen); si falla, se recalcularán"""
+    for clave in [c for c in _huellas if not os.path.exists(_ruta_de_clave(c))]:
+        del _huellas[clave]
+    try:
+        os.makedirs(RUTA_CACHE_IMAGENES, exist_ok=True)
+        temporal = f"{ARCHIVO_HUELLAS}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(_huellas, f)
+        os.replace(temporal, ARCHIVO_HUELLAS)
+    except OSError:
+        pass
+
+
+def huella_de(ruta):
+    """SHA-1 del original; solo se recalcula si cambian su fecha de modificación o su tamaño"""
+    clave, firma = _clave_y_firma(ruta)
+    huellas = _cargar_huellas()
+    guardada = huellas.get(clave)
+    if guardada and guardada[:2] == firma:
+        return guardada[2]
+
+    with open(ruta, "rb") as f:
+        huella = hashlib.sha1(f.read()).hexdigest()
+    huellas[clave] = firma + [huella]
+    _guardar_huellas()
+    return huella
+
+
+def nombre_en_cache(ruta, tamano):
+    """Nombre del archivo escalado: huella del original y tamaño pedido"""
+    ancho, alto = tamano
+    return f"{huella_de(ruta)}_{ancho}x{alto}.png"
+
+
+def imagen_escalada(master, ruta, tamano):
+    """Devuelve un PhotoImage de la imagen reducida para caber en tamano (ancho, alto)
+
+    La primera vez se escala con PIL y se guarda como PNG en la caché; después
+    Tk la carga directamente, sin decodificar ni remuestrear el original.
+    Si el original cambia, su huella cambia y se genera una versión nueva.
+    Las imágenes pertenecen al intérprete de Tk de master, que forma parte de la clave.
+    """
+    nombre = nombre_en_cache(ruta, tamano)
+    clave = (master.tk.interpaddr(), nombre)
+    if clave in _imagenes:
+        return _imagenes[clave]
+
+    destino = os.path.join(RUTA_CACHE_IMAGENES, nombre)
+    if os.path.exists(destino):
+        imagen = tk.PhotoImage(master=master, file=destino)
+    else:
+        imagen = _escalar(master, ruta, tamano, destino)
+    _imagenes[clave] = imagen
+    return imagen
+
+
+def _escalar(master, ruta, tamano, destino):
+    """Escala el original, lo guarda en la caché y devuelve el PhotoImage"""
+    from PIL import Image, ImageTk  # Solo hace falta cuando la caché no tiene la imagen
+
+    with Image.open(ruta) as original:
+        img = original.copy()
+    img.thumbnail(tamano, Image.LANCZOS)
+    try:
+        os.makedirs(RUTA_CACHE_IMAGENES, exist_ok=True)
+        temporal = f"{destino}.tmp"
+        img.save(temporal, "PNG")
+        os.replace(temporal, destino)
+    except OSError:
+        # Sin caché en disco la imagen se usa igualmente desde memoria
+        return ImageTk.PhotoImage(img, master=master)
+    return tk.PhotoImage(master=master, file=destino)
@@ -0,0 +1,226 @@
+import tkinter as tk
+from tkinter import ttk
+from assets.estilos.styles import Styles
+
+
+class ListaVirtual(ttk.Frame):
+    """Lista con desplazamiento que solo dibuja las filas visibles.
+
+    Sustituye a tk.Listbox cuando la cantidad de filas puede ser muy grande:
+    los elementos viven en una secuencia de Python y el Canvas reutiliza unos
+    pocos items de texto para las filas que caben en pantalla. Mantiene los
+    métodos de Listbox que usan los módulos (insert, delete, get, size,
+    curselection, selection_set, selection_clear, activate, see) y genera
+    <<ListboxSelect>> al seleccionar con el ratón o el teclado.
+    """
+
+    def __init__(self, parent, bg=Styles.COLOR_BACKGROUND, fg=Styles.COLOR_TEXT,
+                 selectbackground=Styles.COLOR_PRIMARY, font=Styles.FONT, **kwargs):
+        super().__init__(parent, style="Custom.TFrame", **kwargs)
+        self.bg = bg
+        self.fg = fg
+        self.selectbackground = selectbackground
+        self.font = Styles.get_font(self, font)
+        self.alto_fila = self.font.metrics("linespace") + 4
+
+        self._items = []
+        self._seleccion = None   # índice seleccionado (selección simple)
+        self._activo = 0         # índice con el foco de teclado
+        self._arriba = 0         # desplazamiento vertical en píxeles
+        self._filas = []         # pool de (rectángulo, texto) del Canvas
+        self._redibujo_pendiente = None
+
+        self.canvas = tk.Canvas(self, bg=bg, borderwidth=0, highlightthickness=0, takefocus=1)
+        self.scrollbar = ttk.Scrollbar(
+            self,
+            orient="vertical",
+            command=self.yview,
+            style="Custom.Vertical.TScrollbar"
+        )
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.canvas.bind("<Configure>", lambda e: self._redibujar())
+        self.canvas.bind("<Button-1>", self._on_click)
+        self.canvas.bind("<MouseWheel>", self._on_rueda)
+        self.canvas.bind("<Button-4>", lambda e: self.yview("scroll", -3, "units"))
+        self.canvas.bind("<Button-5>", lambda e: self.yview("scroll", 3, "units"))
+        self.canvas.bind("<Up>", lambda e: self._mover_a(self._activo - 1))
+        self.canvas.bind("<Down>", lambda e: self._mover_a(self._activo + 1))
+        self.canvas.bind("<Prior>", lambda e: self._mover_a(self._activo - self._filas_visibles()))
+        self.canvas.bind("<Next>", lambda e: self._mover_a(self._activo + self._filas_visibles()))
+        self.canvas.bind("<Home>", lambda e: self._mover_a(0))
+        self.canvas.bind("<End>", lambda e: self._mover_a(len(self._items) - 1))
+
+    # --- API compatible con tk.Listbox ---
+
+    def set_items(self, items):
+        """Reemplaza todas las filas por la secuencia indicada"""
+        self._items = items if isinstance(items, list) else list(items)
+        self._seleccion = None
+        self._activo = 0
+        self._arriba = 0
+        self._programar_redibujo()
+
+    def size(self):
+        return len(self._items)
+
+    def get(self, first, last=None):
+        """Devuelve un elemento, o una tupla si se indica un rango (como Listbox)"""
+        if last is None:
+            return self._items[self._indice(first)]
+        return tuple(self._items[self._indice(first):self._indice(last, final=True) + 1])
+
+    def insert(self, index, *elementos):
+        """Inserta filas en la posición indicada (tk.END para añadir al final)"""
+        posicion = self._indice(index, final=True) + 1 if index == tk.END else self._indice(index)
+        self._items[posicion:posicion] = elementos
+        if self._seleccion is not None and self._seleccion >= posicion:
+            self._seleccion += len(elementos)
+        self._programar_redibujo()
+
+    def delete(self, first, last=None):
+        """Elimina una fila o un rango de filas (delete(0, tk.END) vacía la lista)"""
+        if not self._items:
+            return
+        inicio = self._indice(first, final=True)
+        fin = inicio if last is None else self._indice(last, final=True)
+        del self._items[inicio:fin + 1]
+        if self._seleccion is not None:
+            if inicio <= self._seleccion <= fin:
+                self._seleccion = None
+            elif self._seleccion > fin:
+                self._seleccion -= fin - inicio + 1
+        self._activo = min(self._activo, max(len(self._items) - 1, 0))
+        self._arriba = min(self._arriba, self._max_arriba())
+        self._programar_redibujo()
+
+    def set_item(self, index, valor):
+        """Actualiza el texto de una fila sin tocar el resto"""
+        self._items[index] = valor
+        self._programar_redibujo()
+
+    def curselection(self):
+        return () if self._seleccion is None else (self._seleccion,)
+
+    def selection_set(self, first, last=None):
+        if self._items:
+            self._seleccion = self._indice(first)
+            self._programar_redibujo()
+
+    def selection_clear(self, first=0, last=None):
+        self._seleccion = None
+        self._programar_redibujo()
+
+    def activate(self, index):
+        if self._items:
+            self._activo = self._indice(index)
+
+    def see(self, index):
+        """Desplaza la vista lo mínimo para que la fila quede visible"""
+        if not self._items:
+            return
+        y = self._indice(index) * self.alto_fila
+        alto = max(self.canvas.winfo_height(), self.alto_fila)
+        if y < self._arriba:
+            self._arriba = y
+        elif y + self.alto_fila > self._arriba + alto:
+            self._arriba = y + self.alto_fila - alto
+        self._programar_redibujo()
+
+    def yview(self, *args):
+        """Protocolo de desplazamiento de la barra (moveto / scroll)"""
+        if not args:
+            return self._fracciones()
+        if args[0] == "moveto":
+            self._arriba = float(args[1]) * len(self._items) * self.alto_fila
+        elif args[0] == "scroll":
+            cantidad = int(args[1])
+            paso = self.alto_fila if args[2] == "units" else self._filas_visibles() * self.alto_fila
+            self._arriba += cantidad * paso
+        self._arriba = int(max(0, min(self._arriba, self._max_arriba())))
+        self._redibujar()
+
+    def destroy(self):
+        if self._redibujo_pendiente is not None:
+            self.after_cancel(self._redibujo_pendiente)
+            self._redibujo_pendiente = None
+        super().destroy()
+
+    # --- Dibujo ---
+
+    def _programar_redibujo(self):
+        """Agrupa varios cambios seguidos en un solo redibujo"""
+        if self._redibujo_pendiente is None:
+            self._redibujo_pendiente = self.after_idle(self._redibujar)
+
+    def _redibujar(self):
+        self._redibujo_pendiente = None
+        ancho = self.canvas.winfo_width()
+        visibles = self._filas_visibles() + 1
+        primera = self._arriba // self.alto_fila
+
+        # Crear items del Canvas solo hasta cubrir la altura visible
+        while len(self._filas) < visibles:
+            rect = self.canvas.create_rectangle(0, 0, 0, 0, width=0)
+            texto = self.canvas.create_text(0, 0, anchor="w", font=self.font, fill=self.fg)
+            self._filas.append((rect, texto))
+
+        for n, (rect, texto) in enumerate(self._filas):
+            indice = primera + n
+            if n >= visibles or indice >= len(self._items):
+                self.canvas.itemconfigure(rect, state="hidden")
+                self.canvas.itemconfigure(texto, state="hidden")
+                continue
+            y = indice * self.alto_fila - self._arriba
+            fondo = self.selectbackground if indice == self._seleccion else self.bg
+            self.canvas.coords(rect, 0, y, ancho, y + self.alto_fila)
+            self.canvas.itemconfigure(rect, fill=fondo, state="normal")
+            self.canvas.coords(texto, 4, y + self.alto_fila // 2)
+            self.canvas.itemconfigure(texto, text=str(self._items[indice]), state="normal")
+
+        self.scrollbar.set(*self._fracciones())
+
+    def _fracciones(self):
+        total = len(self._items) * self.alto_fila
+        if total <= 0:
+            return 0.0, 1.0
+        alto = max(self.canvas.winfo_height(), 1)
+        return self._arriba / total, min((self._arriba + alto) / total, 1.0)
+
+    def _filas_visibles(self):
+        return max(self.canvas.winfo_height() // self.alto_fila, 1)
+
+    def _max_arriba(self):
+        return max(len(self._items) * self.alto_fila - self.canvas.winfo_height(), 0)
+
+    def _indice(self, index, final=False):
+        """Convierte índices de estilo Listbox (enteros, tk.END, "active") a enteros"""
+        if index == tk.END:
+            return len(self._items) - 1 if final else len(self._items)
+        if index == "active":
+            return self._activo
+        return int(index)
+
+    # --- Eventos ---
+
+    def _seleccionar(self, indice):
+        self._seleccion = indice
+        self._activo = indice
+        self.see(indice)
+        self.event_generate("<<ListboxSelect>>")
+
+    def _on_click(self, event):
+        self.canvas.focus_set()
+        indice = (self._arriba + event.y) // self.alto_fila
+        if 0 <= indice < len(self._items):
+            self._seleccionar(indice)
+
+    def _on_rueda(self, event):
+        self.yview("scroll", -3 if event.delta > 0 else 3, "units")
+        return "break"
+
+    def _mover_a(self, indice):
+        if self._items:
+            self._seleccionar(max(0, min(indice, len(self._items) - 1)))
+        return "break"
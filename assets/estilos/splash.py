@@ -1,15 +1,38 @@
 import tkinter as tk
-from PIL import Image, ImageTk
 from assets.estilos.styles import Styles
+from assets.estilos.imagenes import imagen_escalada
 import random
+import time
+import threading
+from modules.instrumentacion import obtener_logger
+
+log = obtener_logger("splash")
+
+TIEMPO_MINIMO = 1200        # ms que el splash se muestra aunque el arranque termine antes
+TIEMPO_MAXIMO = 4000        # ms tras los que se cierra aunque queden tareas (siguen en marcha)
+INTERVALO_ANIMACION = 30    # ms entre cuadros de la animación y revisiones de las tareas
+ALTO_PROGRESO = 40          # espacio bajo el logo para el texto y la barra
 
 class SplashScreen:
-    def __init__(self, root, on_complete=None):
+    def __init__(self, root, on_complete=None, tareas=None):
         """
-        Splash minimalista que solo muestra el logo con efecto de desvanecimiento
+        Splash que muestra el logo mientras se ejecutan las tareas de arranque
+
+        tareas es una lista de (descripcion, funcion, en_hilo). Las funciones con
+        en_hilo=True corren en un hilo secundario y no deben tocar Tk; las demás
+        se ejecutan en el hilo de Tk entre cuadros de la animación. El splash se
+        cierra cuando terminan todas, pero nunca antes de TIEMPO_MINIMO ni después
+        de TIEMPO_MAXIMO: las que falten continúan con el menú ya visible.
         """
         self.root = root
         self.on_complete = on_complete
+        self.tasks = list(tareas or [])
+        self.current_task = 0
+        self.tasks_done = False
+        self.faded_in = False
+        self.closing = False
+        self.closed = False
+        self.start_time = time.monotonic()
         
         # Crear ventana transparente
         self.splash = tk.Toplevel(root)
@@ -20,9 +43,10 @@ class SplashScreen:
         # Cargar imagen del logo
         self.load_logo_image()
         
-        # Configurar tamaño de ventana según el logo
-        self.width = self.logo_img.width()
-        self.height = self.logo_img.height()
+        # Configurar tamaño de ventana según el logo (más la barra de progreso)
+        self.width = max(self.logo_img.width(), Styles.SPLASH_PROGRESS_WIDTH)
+        self.logo_height = self.logo_img.height()
+        self.height = self.logo_height + ALTO_PROGRESO
         
         # Centrar ventana
         screen_width = root.winfo_screenwidth()
@@ -44,27 +68,128 @@ class SplashScreen:
         # Mostrar logo
         self.logo = self.canvas.create_image(
             self.width // 2,
-            self.height // 2,
+            self.logo_height // 2,
             image=self.logo_img
         )
+        self.create_progress_bar()
         
-        # Iniciar animación
+        # Iniciar animación y, en paralelo, las tareas de arranque
         self.splash.attributes("-alpha", 0.0)  # Iniciar invisible
         self.fade_in()
+        # Las tareas se programan sobre root para que sigan si el splash se cierra antes
+        self.root.after(INTERVALO_ANIMACION, self.run_next_task)
+        self.root.after(TIEMPO_MAXIMO, self.force_close)
         
     def load_logo_image(self):
         """Cargar la imagen del logo manteniendo transparencia"""
         try:
-            img = Image.open(Styles.LOGO_PATH)
-            # Redimensionar si es necesario (opcional)
-            img.thumbnail((300, 300), Image.LANCZOS)
-            self.logo_img = ImageTk.PhotoImage(img)
+            # Versión ya escalada desde la caché de imágenes
+            self.logo_img = imagen_escalada(self.splash, Styles.LOGO_PATH, (300, 300))
         except Exception as e:
-            print(f"Error cargando logo: {e}")
+            log.warning("Error cargando logo: %s", e)
             # Fallback simple
             self.logo_img = tk.PhotoImage(width=1, height=1)
             self.width, self.height = 300, 300
 
+    def create_progress_bar(self):
+        """Dibuja bajo el logo el texto de la tarea actual, la barra y el porcentaje"""
+        estilo = Styles.get_splash_progress_style()
+        x0 = (self.width - Styles.SPLASH_PROGRESS_WIDTH) // 2
+        y0 = self.height - estilo['height'] - 4
+        self.progress_box = (x0, y0, x0 + Styles.SPLASH_PROGRESS_WIDTH, y0 + estilo['height'])
+
+        self.progress_trough = self.canvas.create_rectangle(
+            *self.progress_box,
+            fill=estilo['trough_color'],
+            width=estilo['border_width']
+        )
+        self.progress_fill = self.canvas.create_rectangle(
+            x0, y0, x0, y0 + estilo['height'],
+            fill=estilo['background'],
+            width=estilo['border_width']
+        )
+        self.progress_text = self.canvas.create_text(
+            x0, y0 - 4,
+            anchor="sw",
+            text="",
+            **Styles.get_splash_text_style()
+        )
+        self.progress_percent = self.canvas.create_text(
+            self.progress_box[2], y0 - 4,
+            anchor="se",
+            text="0%",
+            **Styles.get_splash_percent_style()
+        )
+
+    def update_progress(self, descripcion):
+        """Actualiza el texto y la barra según las tareas ya terminadas"""
+        if self.closed:
+            return
+        fraccion = self.current_task / len(self.tasks) if self.tasks else 1.0
+        x0, y0, x1, y1 = self.progress_box
+        self.canvas.coords(self.progress_fill, x0, y0, x0 + (x1 - x0) * fraccion, y1)
+        self.canvas.itemconfigure(self.progress_text, text=descripcion)
+        self.canvas.itemconfigure(self.progress_percent, text=f"{int(fraccion * 100)}%")
+
+    def run_next_task(self):
+        """Lanza la siguiente tarea de arranque o, si no quedan, prepara el cierre"""
+        if self.current_task >= len(self.tasks):
+            self.update_progress("Listo")
+            self.tasks_done = True
+            self.try_close()
+            return
+
+        descripcion, funcion, en_hilo = self.tasks[self.current_task]
+        self.update_progress(f"{descripcion}...")
+        if en_hilo:
+            hilo = threading.Thread(target=self.run_task, args=(descripcion, funcion), daemon=True)
+            hilo.start()
+            self.root.after(INTERVALO_ANIMACION, self.wait_for_task, hilo)
+        else:
+            # Un ciclo de espera para que el texto se dibuje antes de ejecutarla
+            self.root.after(INTERVALO_ANIMACION, self.run_tk_task, descripcion, funcion)
+
+    def run_tk_task(self, descripcion, funcion):
+        """Ejecuta una tarea que necesita el hilo de Tk"""
+        self.run_task(descripcion, funcion)
+        self.task_finished()
+
+    def wait_for_task(self, hilo):
+        """Revisa sin bloquear si la tarea del hilo secundario terminó"""
+        if hilo.is_alive():
+            self.root.after(INTERVALO_ANIMACION, self.wait_for_task, hilo)
+        else:
+            self.task_finished()
+
+    def task_finished(self):
+        """Avanza a la siguiente tarea"""
+        self.current_task += 1
+        self.run_next_task()
+
+    @staticmethod
+    def run_task(descripcion, funcion):
+        """Ejecuta una tarea; un fallo solo se registra, el arranque continúa"""
+        try:
+            funcion()
+        except Exception:
+            log.exception("Falló la tarea de arranque: %s", descripcion)
+
+    def try_close(self):
+        """Inicia el desvanecimiento cuando el arranque terminó y pasó el tiempo mínimo"""
+        if self.closing or not (self.tasks_done and self.faded_in):
+            return
+        self.closing = True
+        transcurrido = int((time.monotonic() - self.start_time) * 1000)
+        self.splash.after(max(0, TIEMPO_MINIMO - transcurrido), self.fade_out)
+
+    def force_close(self):
+        """Cierra el splash al llegar a TIEMPO_MAXIMO aunque el arranque no haya terminado"""
+        if self.closing:
+            return
+        log.warning("El arranque superó %d ms; las tareas pendientes siguen con el menú visible", TIEMPO_MAXIMO)
+        self.closing = True
+        self.fade_out()
+
     def fade_in(self):
         """Efecto de aparición suave"""
         current_alpha = float(self.splash.attributes("-alpha"))
@@ -73,8 +198,9 @@ class SplashScreen:
             self.splash.attributes("-alpha", current_alpha)
             self.splash.after(30, self.fade_in)
         else:
-            # Esperar 1 segundo y luego desvanecer
-            self.splash.after(1000, self.fade_out)
+            # Desvanecer en cuanto terminen las tareas de arranque
+            self.faded_in = True
+            self.try_close()
 
     def fade_out(self):
         """Efecto de desvanecimiento con movimiento"""
@@ -92,6 +218,7 @@ class SplashScreen:
             
             self.splash.after(30, self.fade_out)
         else:
+            self.closed = True
             self.splash.destroy()
             if self.on_complete:
                 self.root.after(100, self.on_complete)
@@ -1,9 +1,9 @@
 import tkinter as tk
 from tkinter import ttk
 from tkinter import messagebox
+import tkinter.font as tkfont
 import os
 import sys
-from PIL import Image, ImageTk
 
 def get_resource_path(relative_path):
     """Obtiene la ruta absoluta para recursos, funciona para desarrollo y para PyInstaller"""
@@ -97,6 +97,10 @@ class Styles:
     SPLASH_HEIGHT = 300
     SPLASH_PROGRESS_HEIGHT = 8
     SPLASH_PROGRESS_WIDTH = 250
+
+    # Registro de temas: los estilos se configuran una vez por intérprete de Tk
+    _styled_interpreters = set()
+    _fonts = {}  # (intérprete, fuente) -> tkfont.Font
     
     @staticmethod
     def configure_splash(splash_window):
@@ -138,9 +142,27 @@ class Styles:
         }
 
     @staticmethod
-    def apply_styles():
-        """Apply comprehensive custom styles to ttk widgets"""
+    def get_font(widget, font=None):
+        """Return a cached tkfont.Font for a font spec (one object per Tk interpreter)"""
+        font = font or Styles.FONT
+        key = (widget.tk.interpaddr(), font)
+        if key not in Styles._fonts:
+            Styles._fonts[key] = tkfont.Font(root=widget, font=font)
+        return Styles._fonts[key]
+
+    @staticmethod
+    def apply_styles(force=False):
+        """Apply comprehensive custom styles to ttk widgets
+
+        The ttk styles belong to the Tk interpreter, so they are configured only
+        the first time; later calls (one per module window) return right away.
+        Use force=True to configure them again.
+        """
         style = ttk.Style()
+        interpreter = style.tk.interpaddr()
+        if interpreter in Styles._styled_interpreters and not force:
+            return style
+        Styles._styled_interpreters.add(interpreter)
         style.theme_use("clam")  # Base para tema oscuro
 
         # Button Styles
@@ -477,6 +499,7 @@ class Styles:
             "Custom.Sizegrip",
             background=Styles.COLOR_ACCENT_DARK
         )
+        return style
 
     @staticmethod
     def show_msg(msg, title="Information"):
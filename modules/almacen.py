@@ -0,0 +1,561 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import threading
+from modules.persistencia import escribir_atomico, cola_guardado
+from modules.instrumentacion import obtener_logger
+
+log = obtener_logger("almacen")
+
+RUTA_REGISTROS = "Registros"
+RUTA_BASE_DATOS = os.path.join(RUTA_REGISTROS, "registros.db")
+
+# APP_ALMACEN=sqlite activa la base de datos (y la importa la primera vez)
+VARIABLE_ACTIVACION = "APP_ALMACEN"
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS secciones (
+    seccion TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS notas (
+    seccion TEXT NOT NULL,
+    archivo TEXT NOT NULL,
+    fecha TEXT,
+    contenido TEXT NOT NULL,
+    actualizado INTEGER NOT NULL,
+    PRIMARY KEY (seccion, archivo)
+);
+CREATE INDEX IF NOT EXISTS notas_por_fecha ON notas (fecha);
+
+CREATE TABLE IF NOT EXISTS materias (
+    materia TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS clases (
+    materia TEXT NOT NULL REFERENCES materias ON DELETE CASCADE,
+    clase TEXT NOT NULL,
+    contenido TEXT NOT NULL,
+    actualizado INTEGER NOT NULL,
+    PRIMARY KEY (materia, clase)
+);
+
+CREATE TABLE IF NOT EXISTS entrenamientos (
+    nombre_base TEXT PRIMARY KEY,
+    fecha TEXT NOT NULL,
+    tipo TEXT,
+    semana INTEGER,
+    datos TEXT NOT NULL,
+    actualizado INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entrenamientos_por_fecha ON entrenamientos (fecha);
+CREATE TABLE IF NOT EXISTS series (
+    nombre_base TEXT NOT NULL REFERENCES entrenamientos ON DELETE CASCADE,
+    orden INTEGER NOT NULL,
+    fecha TEXT NOT NULL,
+    ejercicio TEXT NOT NULL,
+    series REAL,
+    repeticiones REAL,
+    peso REAL,
+    observaciones TEXT,
+    PRIMARY KEY (nombre_base, orden)
+);
+CREATE INDEX IF NOT EXISTS series_por_ejercicio ON series (ejercicio, fecha);
+
+CREATE TABLE IF NOT EXISTS pesajes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    fecha TEXT NOT NULL UNIQUE,
+    peso REAL,
+    registro TEXT NOT NULL
+);
+"""
+
+
+def _numero(valor):
+    """Convierte los valores guardados como texto ("10", "2.5") a float"""
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def _fecha_de_archivo(archivo):
+    """Extrae "YYYY-MM-DD HH:MM:SS" de un nombre "YYYY-MM-DD_HH-MM-SS_titulo.txt"""
+    partes = archivo.split('_')
+    if len(partes) > 2 and len(partes[0]) == 10 and len(partes[1]) == 8:
+        return f"{partes[0]} {partes[1].replace('-', ':')}"
+    return None
+
+
+class Almacen:
+    """Base de datos SQLite opcional con todos los registros de la aplicación.
+
+    Sustituye a los archivos sueltos de Registros/ cuando está activa: las
+    listas, los rangos de fechas y las series de ejercicios se resuelven con
+    consultas indexadas en lugar de recorrer directorios. Se activa con la
+    variable APP_ALMACEN=sqlite (la primera vez importa el árbol existente) o
+    si ya existe Registros/registros.db, y puede exportarse de vuelta a
+    archivos en cualquier momento.
+
+    Los guardados (notas, apuntes, entrenamientos y pesajes) pasan por la cola
+    de guardado como el resto de escrituras; crear o borrar es inmediato porque
+    la interfaz vuelve a leer las listas a continuación.
+    """
+
+    _compartido = None
+    _bloqueo_compartido = threading.Lock()  # El primer uso puede llegar desde otro hilo
+
+    def __init__(self, ruta_base_datos):
+        self.ruta_base_datos = ruta_base_datos
+        self._bloqueo = threading.RLock()
+        directorio = os.path.dirname(ruta_base_datos)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        self._conexion = sqlite3.connect(ruta_base_datos, check_same_thread=False)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("PRAGMA synchronous=NORMAL")
+        self._conexion.execute("PRAGMA foreign_keys=ON")
+        with self._conexion:
+            self._conexion.executescript(ESQUEMA)
+
+    @classmethod
+    def activo(cls):
+        """Devuelve el almacén del proceso, o None si se trabaja con archivos"""
+        if cls._compartido is None:
+            with cls._bloqueo_compartido:
+                if cls._compartido is None:
+                    existe = os.path.exists(RUTA_BASE_DATOS)
+                    pedido = os.environ.get(VARIABLE_ACTIVACION, "").lower() == "sqlite"
+                    if not (existe or pedido):
+                        cls._compartido = False
+                    elif not existe and not cls._crear_importando(RUTA_BASE_DATOS, RUTA_REGISTROS):
+                        cls._compartido = False  # Se sigue con los archivos, que no se tocaron
+                    else:
+                        cls._compartido = cls(RUTA_BASE_DATOS)
+        return cls._compartido or None
+
+    @classmethod
+    def _crear_importando(cls, ruta_base_datos, raiz):
+        """Crea la base de datos importando Registros/ en un archivo temporal
+
+        Solo se mueve a su sitio si la importación termina, así que un fallo no
+        deja una base de datos vacía que las siguientes ejecuciones tomarían por buena.
+        """
+        temporal = f"{ruta_base_datos}.importando"
+        cls._borrar_base_datos(temporal)  # Restos de un intento interrumpido
+        almacen = None
+        try:
+            almacen = cls(temporal)
+            almacen.importar(raiz)
+            almacen.cerrar()
+            os.replace(temporal, ruta_base_datos)
+            return True
+        except (OSError, sqlite3.Error, TypeError, ValueError):
+            log.exception("No se pudo importar %s a la base de datos; se siguen usando los archivos", raiz)
+            if almacen:
+                almacen.cerrar()
+            cls._borrar_base_datos(temporal)
+            return False
+
+    @staticmethod
+    def _borrar_base_datos(ruta):
+        for sufijo in ("", "-wal", "-shm"):
+            try:
+                os.remove(ruta + sufijo)
+            except FileNotFoundError:
+                pass
+
+    def _consultar(self, sql, parametros=()):
+        with self._bloqueo:
+            return self._conexion.execute(sql, parametros).fetchall()
+
+    def _escribir(self, sentencias):
+        """Ejecuta varias sentencias (sql, parámetros) en una sola transacción"""
+        with self._bloqueo, self._conexion:
+            for sql, parametros in sentencias:
+                self._conexion.execute(sql, parametros)
+
+    def _registro(self, *partes):
+        """Ruta que identifica una fila en la cola de guardado ("registros.db/notas/seccion/archivo")"""
+        return os.path.join(self.ruta_base_datos, *partes)
+
+    def _encolar(self, registro, sentencias, al_terminar):
+        """Escribe las sentencias desde el hilo de la cola de guardado"""
+        cola_guardado.ejecutar(registro, lambda: self._escribir(sentencias), al_terminar)
+
+    def _escribir_ahora(self, registro, sentencias):
+        """Escribe de inmediato (crear o borrar), descartando antes los guardados pendientes de esas filas"""
+        cola_guardado.cancelar(registro)
+        self._escribir(sentencias)
+
+    # --- Diario ---
+
+    def secciones(self):
+        return [fila[0] for fila in self._consultar("SELECT seccion FROM secciones ORDER BY seccion")]
+
+    def crear_seccion(self, seccion):
+        self._escribir([("INSERT OR IGNORE INTO secciones VALUES (?)", (seccion,))])
+
+    def cabeceras_notas(self, seccion, tamano):
+        """Devuelve (archivo, primeros caracteres, actualizado) de las notas, de la última modificada a la primera"""
+        return self._consultar(
+            "SELECT archivo, substr(contenido, 1, ?), actualizado FROM notas "
+            "WHERE seccion = ? ORDER BY actualizado DESC",
+            (tamano, seccion)
+        )
+
+    def nota(self, seccion, archivo):
+        """Devuelve (contenido, actualizado) de una nota, o None si no existe"""
+        filas = self._consultar(
+            "SELECT contenido, actualizado FROM notas WHERE seccion = ? AND archivo = ?",
+            (seccion, archivo)
+        )
+        return filas[0] if filas else None
+
+    def notas_entre(self, desde, hasta, tamano):
+        """Devuelve (fecha, seccion, archivo, primeros caracteres) con desde <= fecha < hasta
+
+        De la más reciente a la más antigua. Usa el índice notas_por_fecha; los
+        límites pueden ser "YYYY-MM-DD" o marcas "YYYY-MM-DD HH:MM:SS".
+        """
+        return self._consultar(
+            "SELECT fecha, seccion, archivo, substr(contenido, 1, ?) FROM notas "
+            "WHERE fecha >= ? AND fecha < ? ORDER BY fecha DESC",
+            (tamano, desde, hasta)
+        )
+
+    def firmas_notas(self):
+        """Devuelve {"seccion/archivo": (actualizado, tamaño)} de todas las notas"""
+        filas = self._consultar("SELECT seccion, archivo, actualizado, length(contenido) FROM notas")
+        return {f"{seccion}/{archivo}": (actualizado, tamano)
+                for seccion, archivo, actualizado, tamano in filas}
+
+    def guardar_nota(self, seccion, archivo, contenido, al_terminar=None):
+        self._encolar(self._registro("notas", seccion, archivo), [
+            ("INSERT OR IGNORE INTO secciones VALUES (?)", (seccion,)),
+            ("INSERT OR REPLACE INTO notas VALUES (?, ?, ?, ?, ?)",
+             (seccion, archivo, _fecha_de_archivo(archivo), contenido, time.time_ns()))
+        ], al_terminar)
+
+    def eliminar_nota(self, seccion, archivo):
+        self._escribir_ahora(self._registro("notas", seccion, archivo),
+                       [("DELETE FROM notas WHERE seccion = ? AND archivo = ?", (seccion, archivo))])
+
+    # --- Mochila ---
+
+    def materias(self):
+        return [fila[0] for fila in self._consultar("SELECT materia FROM materias ORDER BY materia")]
+
+    def crear_materia(self, materia):
+        self._escribir([("INSERT OR IGNORE INTO materias VALUES (?)", (materia,))])
+
+    def eliminar_materia(self, materia):
+        self._escribir_ahora(self._registro("materias", materia),
+                       [("DELETE FROM materias WHERE materia = ?", (materia,))])
+
+    def clases(self, materia):
+        filas = self._consultar("SELECT clase FROM clases WHERE materia = ? ORDER BY clase", (materia,))
+        return [fila[0] for fila in filas]
+
+    def clase(self, materia, clase):
+        """Devuelve (bloques, actualizado) de un apunte, o None si no existe"""
+        filas = self._consultar(
+            "SELECT contenido, actualizado FROM clases WHERE materia = ? AND clase = ?",
+            (materia, clase)
+        )
+        return (json.loads(filas[0][0]), filas[0][1]) if filas else None
+
+    def firmas_clases(self):
+        """Devuelve {"materia/clase": (actualizado, tamaño)} de todos los apuntes"""
+        filas = self._consultar("SELECT materia, clase, actualizado, length(contenido) FROM clases")
+        return {f"{materia}/{clase}": (actualizado, tamano)
+                for materia, clase, actualizado, tamano in filas}
+
+    def firma_clase(self, materia, clase):
+        """Devuelve (actualizado, tamaño) de un apunte, o None si no existe"""
+        filas = self._consultar(
+            "SELECT actualizado, length(contenido) FROM clases WHERE materia = ? AND clase = ?",
+            (materia, clase)
+        )
+        return filas[0] if filas else None
+
+    def guardar_clase(self, materia, clase, bloques, al_terminar=None):
+        self._encolar(self._registro("materias", materia, clase),
+                      self._sentencias_clase(materia, clase, bloques), al_terminar)
+
+    def crear_clase(self, materia, clase, bloques):
+        """Crea (o sobrescribe) un apunte de inmediato"""
+        self._escribir_ahora(self._registro("materias", materia, clase),
+                       self._sentencias_clase(materia, clase, bloques))
+
+    @staticmethod
+    def _sentencias_clase(materia, clase, bloques):
+        return [
+            ("INSERT OR IGNORE INTO materias VALUES (?)", (materia,)),
+            ("INSERT OR REPLACE INTO clases VALUES (?, ?, ?, ?)",
+             (materia, clase, json.dumps(bloques, ensure_ascii=False), time.time_ns()))
+        ]
+
+    def eliminar_clase(self, materia, clase):
+        self._escribir_ahora(self._registro("materias", materia, clase),
+                       [("DELETE FROM clases WHERE materia = ? AND clase = ?", (materia, clase))])
+
+    # --- Gimnasio ---
+
+    def firmas_entrenamientos(self):
+        """Devuelve {nombre_base: actualizado} de todos los entrenamientos"""
+        return dict(self._consultar("SELECT nombre_base, actualizado FROM entrenamientos"))
+
+    def entrenamiento(self, nombre_base):
+        """Devuelve (datos, actualizado) de un entrenamiento, o None si no existe"""
+        filas = self._consultar(
+            "SELECT datos, actualizado FROM entrenamientos WHERE nombre_base = ?", (nombre_base,)
+        )
+        return (json.loads(filas[0][0]), filas[0][1]) if filas else None
+
+    def ejercicios(self):
+        """Nombres de todos los ejercicios registrados (recorre solo el índice series_por_ejercicio)"""
+        filas = self._consultar("SELECT DISTINCT ejercicio FROM series WHERE ejercicio != '' ORDER BY ejercicio")
+        return [fila[0] for fila in filas]
+
+    def serie_ejercicio(self, ejercicio):
+        """Devuelve (fecha, nombre_base, peso, repeticiones, series) de un ejercicio ordenados por fecha
+
+        Como el índice en memoria, toma la primera aparición del ejercicio en
+        cada entrenamiento y omite las que no tienen un peso numérico.
+        """
+        return self._consultar(
+            "SELECT s.fecha, s.nombre_base, s.peso, s.repeticiones, s.series FROM series s "
+            "WHERE s.ejercicio = ? AND s.peso IS NOT NULL AND s.orden = ("
+            "    SELECT min(orden) FROM series WHERE nombre_base = s.nombre_base AND ejercicio = s.ejercicio"
+            ") ORDER BY s.fecha, s.nombre_base",
+            (ejercicio,)
+        )
+
+    def guardar_entrenamiento(self, nombre_base, datos, al_terminar=None):
+        self._encolar(self._registro("entrenamientos", nombre_base),
+                      self._sentencias_entrenamiento(nombre_base, datos), al_terminar)
+
+    def _sentencias_entrenamiento(self, nombre_base, datos, actualizado=None):
+        """Sentencias que reemplazan un entrenamiento y sus series"""
+        fecha = nombre_base.split('_')[0]
+        sentencias = [
+            ("DELETE FROM entrenamientos WHERE nombre_base = ?", (nombre_base,)),
+            ("INSERT INTO entrenamientos VALUES (?, ?, ?, ?, ?, ?)",
+             (nombre_base, fecha, datos.get('tipo'), datos.get('semana'),
+              json.dumps(datos, ensure_ascii=False), actualizado or time.time_ns()))
+        ]
+        ejercicios = datos.get('ejercicios')
+        if not isinstance(ejercicios, list):
+            ejercicios = []  # Entrenamiento sin series antes que abortar toda la transacción
+        for orden, ej in enumerate(ejercicios):
+            if not isinstance(ej, dict):
+                continue
+            sentencias.append((
+                "INSERT INTO series VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (nombre_base, orden, fecha, ej.get('ejercicio') or "",
+                 _numero(ej.get('series')), _numero(ej.get('repeticiones')),
+                 _numero(ej.get('peso')), ej.get('observaciones'))
+            ))
+        return sentencias
+
+    # --- Peso ---
+
+    def pesajes_desde(self, ultimo_id=0):
+        """Devuelve (registros, último id) de los pesajes guardados después de `ultimo_id`"""
+        filas = self._consultar("SELECT id, registro FROM pesajes WHERE id > ? ORDER BY id", (ultimo_id,))
+        if not filas:
+            return [], ultimo_id
+        return [json.loads(registro) for _, registro in filas], filas[-1][0]
+
+    def ultimos_pesajes(self, cantidad):
+        filas = self._consultar("SELECT registro FROM pesajes ORDER BY id DESC LIMIT ?", (cantidad,))
+        return [json.loads(fila[0]) for fila in reversed(filas)]
+
+    def guardar_pesaje(self, registro, al_terminar=None):
+        self._encolar(self._registro("pesajes", registro['fecha']),
+                      [self._sentencia_pesaje(registro)], al_terminar)
+
+    @staticmethod
+    def _sentencia_pesaje(registro):
+        return ("INSERT OR REPLACE INTO pesajes (fecha, peso, registro) VALUES (?, ?, ?)",
+                (registro['fecha'], _numero(registro.get('peso')),
+                 json.dumps(registro, ensure_ascii=False)))
+
+    # --- Importación y exportación ---
+
+    def importar(self, raiz=RUTA_REGISTROS):
+        """Carga en la base de datos el árbol de archivos de Registros/ (idempotente)"""
+        sentencias = []
+        total = 0
+        if not os.path.isdir(raiz):
+            return total
+
+        for seccion in sorted(os.listdir(raiz)):
+            ruta_seccion = os.path.join(raiz, seccion)
+            if seccion.startswith(".") or not os.path.isdir(ruta_seccion):
+                continue
+            sentencias.append(("INSERT OR IGNORE INTO secciones VALUES (?)", (seccion,)))
+            for archivo in os.listdir(ruta_seccion):
+                if not archivo.endswith(".txt"):
+                    continue
+                ruta = os.path.join(ruta_seccion, archivo)
+                try:
+                    with open(ruta, "r", encoding="utf-8", errors="replace") as f:
+                        contenido = f.read()
+                    modificado = os.stat(ruta).st_mtime_ns  # Conserva el orden por modificación
+                except OSError:
+                    continue
+                sentencias.append(("INSERT OR REPLACE INTO notas VALUES (?, ?, ?, ?, ?)",
+                                   (seccion, archivo, _fecha_de_archivo(archivo), contenido, modificado)))
+                total += 1
+
+        ruta_mochila = os.path.join(raiz, "Mochila")
+        if os.path.isdir(ruta_mochila):
+            for materia in sorted(os.listdir(ruta_mochila)):
+                ruta_materia = os.path.join(ruta_mochila, materia)
+                if not os.path.isdir(ruta_materia):
+                    continue
+                sentencias.append(("INSERT OR IGNORE INTO materias VALUES (?)", (materia,)))
+                for archivo in os.listdir(ruta_materia):
+                    ruta = os.path.join(ruta_materia, archivo)
+                    bloques = self._leer_json(ruta) if archivo.endswith(".json") else None
+                    if not isinstance(bloques, list):
+                        continue
+                    sentencias.append(("INSERT OR REPLACE INTO clases VALUES (?, ?, ?, ?)",
+                                       (materia, archivo[:-5], json.dumps(bloques, ensure_ascii=False),
+                                        self._modificado(ruta))))
+                    total += 1
+
+        ruta_gimnasio = os.path.join(raiz, "Gimnasio")
+        if os.path.isdir(ruta_gimnasio):
+            for archivo in sorted(os.listdir(ruta_gimnasio)):
+                ruta = os.path.join(ruta_gimnasio, archivo)
+                datos = self._leer_json(ruta) if archivo.endswith(".json") else None
+                if not isinstance(datos, dict):
+                    continue
+                sentencias.extend(self._sentencias_entrenamiento(archivo[:-5], datos, self._modificado(ruta)))
+                total += 1
+
+        ruta_peso = os.path.join(raiz, "Peso")
+        if os.path.isdir(ruta_peso):
+            # Primero los antiguos archivos diarios; la bitácora tiene la última palabra
+            registros = []
+            for archivo in sorted(os.listdir(ruta_peso)):
+                if archivo.startswith("peso_") and archivo.endswith(".json"):
+                    registros.append(self._leer_json(os.path.join(ruta_peso, archivo)))
+            try:
+                with open(os.path.join(ruta_peso, "peso.jsonl"), "r", encoding="utf-8") as f:
+                    for linea in f:
+                        try:
+                            registros.append(json.loads(linea))
+                        except ValueError:
+                            continue
+            except OSError:
+                pass
+            for registro in registros:
+                if isinstance(registro, dict) and 'fecha' in registro:
+                    sentencias.append(self._sentencia_pesaje(registro))
+                    total += 1
+
+        self._escribir(sentencias)
+        log.info("Importados %d registros desde %s", total, raiz)
+        return total
+
+    def exportar(self, raiz=RUTA_REGISTROS):
+        """Escribe el contenido de la base de datos como el árbol de archivos de Registros/
+
+        Los archivos de notas, apuntes y entrenamientos cuyas filas ya no están
+        en la base de datos se borran, para que el árbol refleje lo mismo.
+        """
+        total = 0
+        notas = {}
+        for seccion in self.secciones():
+            os.makedirs(os.path.join(raiz, seccion), exist_ok=True)
+            notas[seccion] = set()
+        for seccion, archivo, contenido in self._consultar("SELECT seccion, archivo, contenido FROM notas"):
+            escribir_atomico(os.path.join(raiz, seccion, archivo), contenido.encode("utf-8"))
+            notas.setdefault(seccion, set()).add(archivo)
+            total += 1
+        for seccion, archivos in notas.items():
+            self._borrar_sobrantes(os.path.join(raiz, seccion), ".txt", archivos)
+
+        clases = {}
+        for materia in self.materias():
+            os.makedirs(os.path.join(raiz, "Mochila", materia), exist_ok=True)
+            clases[materia] = set()
+        for materia, clase, contenido in self._consultar("SELECT materia, clase, contenido FROM clases"):
+            texto = json.dumps(json.loads(contenido), indent=2, ensure_ascii=False)
+            escribir_atomico(os.path.join(raiz, "Mochila", materia, f"{clase}.json"), texto.encode("utf-8"))
+            clases[materia].add(f"{clase}.json")
+            total += 1
+        ruta_mochila = os.path.join(raiz, "Mochila")
+        if os.path.isdir(ruta_mochila):
+            for materia in os.listdir(ruta_mochila):
+                ruta_materia = os.path.join(ruta_mochila, materia)
+                if os.path.isdir(ruta_materia):
+                    self._borrar_sobrantes(ruta_materia, ".json", clases.get(materia, set()))
+                    if materia not in clases and not os.listdir(ruta_materia):
+                        os.rmdir(ruta_materia)
+
+        entrenamientos = set()
+        for nombre_base, datos in self._consultar("SELECT nombre_base, datos FROM entrenamientos"):
+            texto = json.dumps(json.loads(datos), indent=2, ensure_ascii=False)
+            escribir_atomico(os.path.join(raiz, "Gimnasio", f"{nombre_base}.json"), texto.encode("utf-8"))
+            entrenamientos.add(f"{nombre_base}.json")
+            total += 1
+        self._borrar_sobrantes(os.path.join(raiz, "Gimnasio"), ".json", entrenamientos)
+
+        pesajes = self._consultar("SELECT registro FROM pesajes ORDER BY fecha")
+        ruta_bitacora = os.path.join(raiz, "Peso", "peso.jsonl")
+        if pesajes or os.path.exists(ruta_bitacora):
+            lineas = [json.dumps(json.loads(fila[0]), ensure_ascii=False, separators=(",", ":")) + "\n"
+                      for fila in pesajes]
+            escribir_atomico(ruta_bitacora, "".join(lineas).encode("utf-8"))
+            total += len(pesajes)
+
+        log.info("Exportados %d registros a %s", total, raiz)
+        return total
+
+    @staticmethod
+    def _borrar_sobrantes(carpeta, extension, conservar):
+        """Borra de una carpeta los archivos con esa extensión que no estén en `conservar`"""
+        if not os.path.isdir(carpeta):
+            return
+        for archivo in os.listdir(carpeta):
+            ruta = os.path.join(carpeta, archivo)
+            if archivo.endswith(extension) and archivo not in conservar and os.path.isfile(ruta):
+                os.remove(ruta)
+                log.info("Exportación: borrado %s (ya no está en la base de datos)", ruta)
+
+    @staticmethod
+    def _modificado(ruta):
+        """mtime del archivo importado, para conservar su fecha de modificación"""
+        try:
+            return os.stat(ruta).st_mtime_ns
+        except OSError:
+            return time.time_ns()
+
+    @staticmethod
+    def _leer_json(ruta):
+        try:
+            with open(ruta, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def cerrar(self):
+        with self._bloqueo:
+            self._conexion.close()
+
+
+if __name__ == "__main__":
+    # python -m modules.almacen importar|exportar [carpeta]
+    if len(sys.argv) < 2 or sys.argv[1] not in ("importar", "exportar"):
+        print("Uso: python -m modules.almacen importar|exportar [carpeta]")
+        sys.exit(1)
+    almacen = Almacen(RUTA_BASE_DATOS)
+    carpeta = sys.argv[2] if len(sys.argv) > 2 else RUTA_REGISTROS
+    total = getattr(almacen, sys.argv[1])(carpeta)
+    print(f"{total} registros procesados")
+    almacen.cerrar()
@@ -0,0 +1,292 @@
+import os
+import re
+import json
+import math
+import threading
+import unicodedata
+import tkinter as tk
+from bisect import bisect_left
+from modules.persistencia import escribir_atomico, cola_guardado
+from modules.instrumentacion import obtener_logger
+
+log = obtener_logger("busqueda")
+
+# Palabras vacías del español que no aportan a la búsqueda
+PALABRAS_VACIAS = frozenset("""
+    a al algo como con de del el ella ellas ellos en entre era es esa ese eso esta
+    este esto fue ha hay la las le les lo los mas me mi mis muy ni no nos o para
+    pero por que se si sin sobre su sus te ti tu tus un una uno unos unas y ya yo
+""".split())
+
+_PALABRA = re.compile(r"\w+")
+
+
+def normalizar(texto):
+    """Pasa a minúsculas y quita tildes y diéresis ("Canción" -> "cancion")"""
+    descompuesto = unicodedata.normalize("NFKD", texto.lower())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+def tokenizar(texto):
+    """Divide un texto en términos normalizados sin palabras vacías"""
+    return [t for t in _PALABRA.findall(normalizar(texto)) if t not in PALABRAS_VACIAS]
+
+
+class IndiceInvertido:
+    """Índice invertido persistente para buscar texto en los registros.
+
+    Cada documento se indexa a partir de bloques (texto, peso, línea): el peso
+    permite que un título cuente más que una línea normal y la línea indica
+    dónde aparece por primera vez cada término. Se guarda en disco como JSON
+    junto con la firma (mtime, tamaño) de cada archivo para poder reindexar
+    solo lo que cambió.
+    """
+
+    VERSION = 1
+
+    _compartidos = {}
+    _bloqueo_compartidos = threading.Lock()  # El arranque los carga desde otro hilo
+
+    def __init__(self, ruta_archivo):
+        self.ruta_archivo = ruta_archivo
+        self.documentos = {}     # doc_id -> {'firma', 'terminos': {termino: [peso, linea]}, 'meta'}
+        self.sincronizado = False
+        self._postings = {}      # termino -> set(doc_id)
+        self._vocabulario = None # términos ordenados para las búsquedas por prefijo
+        self._modificado = False
+
+    @classmethod
+    def compartido(cls, ruta_archivo):
+        """Devuelve el índice del proceso para el archivo indicado (lo carga si no existe)"""
+        clave = os.path.abspath(ruta_archivo)
+        if clave not in cls._compartidos:
+            with cls._bloqueo_compartidos:
+                if clave not in cls._compartidos:
+                    indice = cls(ruta_archivo)
+                    indice.cargar()
+                    cls._compartidos[clave] = indice
+        return cls._compartidos[clave]
+
+    def cargar(self):
+        """Carga el índice guardado en disco (si existe y es de la versión actual)"""
+        try:
+            with open(self.ruta_archivo, "r", encoding="utf-8") as f:
+                datos = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(datos, dict) or datos.get("version") != self.VERSION:
+            return
+
+        self.documentos = datos.get("documentos", {})
+        self._postings = {}
+        for doc_id, documento in self.documentos.items():
+            for termino in documento["terminos"]:
+                self._postings.setdefault(termino, set()).add(doc_id)
+        self._vocabulario = None
+
+    def guardar(self):
+        """Escribe el índice en disco si cambió desde la última vez"""
+        if not self._modificado:
+            return
+        cola_guardado.cancelar(self.ruta_archivo)  # Una escritura en cola sería más antigua
+        escribir_atomico(self.ruta_archivo, self._serializar(self.documentos))
+        self._modificado = False
+
+    def programar_guardado(self):
+        """Escribe el índice en segundo plano con la cola de guardado (si cambió)
+
+        Los documentos se reemplazan enteros al reindexar, así que basta una
+        copia superficial para que el hilo de escritura no vea cambios a medias.
+        Varias llamadas seguidas se agrupan en una sola escritura.
+        """
+        if not self._modificado:
+            return
+        documentos = dict(self.documentos)
+        self._modificado = False
+
+        def al_terminar(error):
+            if error is not None:
+                log.error("Error guardando el índice de búsqueda %s: %s", self.ruta_archivo, error)
+                self._modificado = True
+
+        cola_guardado.ejecutar(
+            self.ruta_archivo,
+            lambda: escribir_atomico(self.ruta_archivo, self._serializar(documentos)),
+            al_terminar
+        )
+
+    def _serializar(self, documentos):
+        return json.dumps({"version": self.VERSION, "documentos": documentos},
+                          ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def firma(self, doc_id):
+        """Devuelve la firma (mtime_ns, tamaño) con la que se indexó un documento"""
+        documento = self.documentos.get(doc_id)
+        return tuple(documento["firma"]) if documento else None
+
+    def agregar(self, doc_id, bloques, firma=None, meta=None):
+        """Indexa (o reindexa) un documento a partir de bloques (texto, peso, línea)"""
+        self.quitar(doc_id)
+        terminos = {}
+        for texto, peso, linea in bloques:
+            for termino in tokenizar(texto):
+                if termino in terminos:
+                    terminos[termino][0] += peso
+                else:
+                    terminos[termino] = [peso, linea]
+
+        self.documentos[doc_id] = {
+            "firma": list(firma) if firma else None,
+            "terminos": terminos,
+            "meta": meta or {}
+        }
+        for termino in terminos:
+            if termino not in self._postings:
+                self._vocabulario = None
+            self._postings.setdefault(termino, set()).add(doc_id)
+        self._modificado = True
+
+    def quitar(self, doc_id):
+        """Elimina un documento del índice"""
+        documento = self.documentos.pop(doc_id, None)
+        if documento is None:
+            return
+        for termino in documento["terminos"]:
+            docs = self._postings.get(termino)
+            if docs is None:
+                continue
+            docs.discard(doc_id)
+            if not docs:
+                del self._postings[termino]
+                self._vocabulario = None
+        self._modificado = True
+
+    def reindexar(self, doc_id, lector):
+        """Actualiza un documento tras guardarlo o borrarlo y programa la escritura del índice
+
+        `lector()` devuelve (bloques, firma, meta), o None si el documento ya no
+        existe. Antes de la primera sincronización no hace nada: esta lo pondrá
+        al día igualmente.
+        """
+        if not self.sincronizado:
+            return
+        try:
+            leido = lector()
+        except (OSError, ValueError):
+            leido = None
+        if leido is None:
+            self.quitar(doc_id)
+        else:
+            bloques, firma, meta = leido
+            self.agregar(doc_id, bloques, firma, meta)
+        self.programar_guardado()
+
+    def quitar_prefijo(self, prefijo):
+        """Elimina los documentos cuyo doc_id empieza por el prefijo ("materia/") y programa la escritura"""
+        for doc_id in [d for d in self.documentos if d.startswith(prefijo)]:
+            self.quitar(doc_id)
+        self.programar_guardado()
+
+    def sincronizar(self, archivos, lector):
+        """Pone el índice al día con los archivos existentes
+
+        `archivos` es un diccionario doc_id -> (ruta, firma) y `lector(ruta, doc_id)`
+        devuelve (bloques, meta) para los documentos nuevos o modificados.
+        """
+        for doc_id in set(self.documentos) - set(archivos):
+            self.quitar(doc_id)
+
+        for doc_id, (ruta, firma) in archivos.items():
+            if self.firma(doc_id) == tuple(firma):
+                continue
+            try:
+                bloques, meta = lector(ruta, doc_id)
+            except (OSError, ValueError):
+                self.quitar(doc_id)
+                continue
+            self.agregar(doc_id, bloques, firma, meta)
+
+        self.sincronizado = True
+
+    def _expandir_prefijo(self, prefijo):
+        """Devuelve los términos del vocabulario que empiezan por el prefijo"""
+        if self._vocabulario is None:
+            self._vocabulario = sorted(self._postings)
+        inicio = bisect_left(self._vocabulario, prefijo)
+        terminos = []
+        for termino in self._vocabulario[inicio:]:
+            if not termino.startswith(prefijo):
+                break
+            terminos.append(termino)
+        return terminos
+
+    def buscar(self, consulta, limite=50):
+        """Busca documentos que contengan todos los términos de la consulta
+
+        El último término también se busca como prefijo, para encontrar
+        resultados mientras se escribe. Devuelve una lista de
+        (doc_id, puntuación, línea, meta) ordenada por relevancia.
+        """
+        terminos = tokenizar(consulta)
+        if not terminos:
+            return []
+
+        # Cada grupo contiene el término de la consulta y las variantes aceptadas
+        grupos = [(t, [t]) for t in terminos[:-1]]
+        grupos.append((terminos[-1], self._expandir_prefijo(terminos[-1])))
+
+        candidatos = None
+        for _, grupo in grupos:
+            docs = set()
+            for termino in grupo:
+                docs |= self._postings.get(termino, set())
+            candidatos = docs if candidatos is None else candidatos & docs
+            if not candidatos:
+                return []
+
+        total = len(self.documentos)
+        resultados = []
+        for doc_id in candidatos:
+            documento = self.documentos[doc_id]
+            puntuacion = 0.0
+            linea = None
+            for original, grupo in grupos:
+                for termino in grupo:
+                    datos = documento["terminos"].get(termino)
+                    if datos is None:
+                        continue
+                    peso, linea_termino = datos
+                    idf = math.log(1 + total / len(self._postings[termino]))
+                    relevancia = (1 + math.log(peso)) * idf if peso >= 1 else peso * idf
+                    # Las coincidencias solo por prefijo cuentan menos que las exactas
+                    puntuacion += relevancia if termino == original else relevancia * 0.3
+                    if linea_termino is not None and (linea is None or linea_termino < linea):
+                        linea = linea_termino
+            resultados.append((doc_id, puntuacion, linea, documento["meta"]))
+
+        resultados.sort(key=lambda r: (-r[1], r[0]))
+        return resultados[:limite]
+
+
+def mostrar_resultados(lista, indice, consulta, listar_archivos, lector, etiqueta):
+    """Rellena la lista de resultados de una caja de búsqueda y devuelve [(doc_id, línea)]
+
+    La primera búsqueda pone el índice al día con `listar_archivos()` y
+    `lector` (solo relee lo modificado). `etiqueta(meta)` da el texto de cada fila.
+    """
+    lista.delete(0, tk.END)
+    resultados = []
+    if not consulta:
+        return resultados
+
+    if not indice.sincronizado:
+        indice.sincronizar(listar_archivos(), lector)
+        indice.programar_guardado()
+
+    for doc_id, _, linea, meta in indice.buscar(consulta):
+        lista.insert(tk.END, etiqueta(meta))
+        resultados.append((doc_id, linea))
+
+    if not resultados:
+        lista.insert(tk.END, "Sin resultados")
+    return resultados
@@ -0,0 +1,465 @@
+import os
+import json
+import threading
+from array import array
+from bisect import bisect_left, insort
+from datetime import date
+from modules.persistencia import cola_guardado
+from modules.almacen import Almacen
+
+
+class SerieEjercicio:
+    """Historial de un ejercicio en columnas paralelas ordenadas por fecha"""
+
+    def __init__(self):
+        self.claves = []                # (fecha, nombre_base), mantiene el orden
+        self.fechas = []                # datetime.date
+        self.pesos = array("d")
+        self.repeticiones = array("l")
+        self.series = array("l")
+
+    def __len__(self):
+        return len(self.claves)
+
+    @classmethod
+    def desde_filas(cls, filas):
+        """Crea la serie a partir de filas (fecha, nombre_base, peso, repeticiones, series) ya ordenadas"""
+        serie = cls()
+        for fecha, nombre_base, peso, repeticiones, series in filas:
+            try:
+                fecha = date.fromisoformat(fecha)
+            except ValueError:
+                continue
+            serie.claves.append((fecha, nombre_base))
+            serie.fechas.append(fecha)
+            serie.pesos.append(peso)
+            serie.repeticiones.append(int(repeticiones or 0))
+            serie.series.append(int(series or 0))
+        return serie
+
+    def agregar(self, clave, peso, repeticiones, series):
+        """Inserta un registro en su posición según la fecha"""
+        i = bisect_left(self.claves, clave)
+        if i < len(self.claves) and self.claves[i] == clave:
+            self.quitar(clave)
+        self.claves.insert(i, clave)
+        self.fechas.insert(i, clave[0])
+        self.pesos.insert(i, peso)
+        self.repeticiones.insert(i, repeticiones)
+        self.series.insert(i, series)
+
+    def quitar(self, clave):
+        """Elimina el registro con la clave indicada si existe"""
+        i = bisect_left(self.claves, clave)
+        if i < len(self.claves) and self.claves[i] == clave:
+            del self.claves[i]
+            del self.fechas[i]
+            del self.pesos[i]
+            del self.repeticiones[i]
+            del self.series[i]
+
+
+def _a_numero(valor, tipo):
+    """Convierte los valores guardados como texto ("10", "2.5") al tipo pedido"""
+    try:
+        return tipo(float(valor))
+    except (TypeError, ValueError):
+        return None
+
+
+class IndiceEntrenamientos:
+    """Índice en memoria de los entrenamientos guardados en Registros/Gimnasio.
+
+    Se comparte entre todas las ventanas del proceso y solo vuelve a leer los
+    archivos cuya fecha de modificación o tamaño cambiaron desde el último escaneo.
+    """
+
+    _compartidos = {}
+    _bloqueo_compartidos = threading.Lock()  # El arranque lo crea desde otro hilo
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.entrenamientos = {}  # nombre_base -> datos del entrenamiento
+        self._firmas = {}         # nombre_base -> (mtime_ns, tamaño)
+        self.series = {}          # ejercicio -> SerieEjercicio (solo registros con peso numérico)
+        self.ejercicios = {}      # ejercicio -> entrenamientos en los que aparece
+        self.por_fecha = {}       # "YYYY-MM-DD" -> [nombre_base, ...] ordenados
+
+    @classmethod
+    def compartido(cls, ruta):
+        """Devuelve el índice del proceso para la ruta indicada (lo crea si no existe)"""
+        clave = os.path.abspath(ruta)
+        if clave not in cls._compartidos:
+            with cls._bloqueo_compartidos:
+                if clave not in cls._compartidos:
+                    cls._compartidos[clave] = cls(ruta)
+        return cls._compartidos[clave]
+
+    def actualizar(self):
+        """Escanea el directorio y vuelve a leer solo los archivos modificados"""
+        return self.aplicar_cambios(self.leer_cambios())
+
+    def leer_cambios(self):
+        """Lee los entrenamientos nuevos o modificados sin tocar el índice
+
+        Puede ejecutarse en un hilo secundario; el resultado se aplica después
+        en el hilo de Tk con aplicar_cambios().
+        """
+        conocidas = dict(self._firmas)
+        leidos = []  # (nombre_base, datos, firma nueva, firma conocida)
+        almacen = Almacen.activo()
+        if almacen:
+            firmas = almacen.firmas_entrenamientos()
+            for nombre_base, firma in firmas.items():
+                if conocidas.get(nombre_base) != firma:
+                    guardado = almacen.entrenamiento(nombre_base)
+                    if guardado is not None:
+                        leidos.append((nombre_base, guardado[0], guardado[1], conocidas.get(nombre_base)))
+            vistos = set(firmas)
+        else:
+            vistos = set()
+            if os.path.isdir(self.ruta):
+                with os.scandir(self.ruta) as entradas:
+                    for entrada in entradas:
+                        if not entrada.name.endswith(".json") or not entrada.is_file():
+                            continue
+                        nombre_base = os.path.splitext(entrada.name)[0]
+                        vistos.add(nombre_base)
+                        try:
+                            stat = entrada.stat()
+                        except OSError:
+                            continue
+                        firma = (stat.st_mtime_ns, stat.st_size)
+                        if conocidas.get(nombre_base) != firma:
+                            datos = self._leer_archivo(entrada.path)
+                            leidos.append((nombre_base, datos, firma, conocidas.get(nombre_base)))
+
+        # Los entrenamientos cuyos archivos ya no existen
+        eliminados = [(nombre_base, conocidas[nombre_base]) for nombre_base in set(conocidas) - vistos]
+        return leidos, eliminados
+
+    def aplicar_cambios(self, cambios):
+        """Incorpora al índice lo leído por leer_cambios()"""
+        leidos, eliminados = cambios
+        for nombre_base, datos, firma, conocida in leidos:
+            # Si entretanto se registró una versión más nueva, se conserva esa
+            if self._firmas.get(nombre_base) == conocida:
+                self._indexar(nombre_base, datos, firma)
+        for nombre_base, conocida in eliminados:
+            if self._firmas.get(nombre_base) == conocida:
+                self._quitar(nombre_base)
+        return self.entrenamientos
+
+    def sesiones(self, fecha):
+        """Devuelve todas las sesiones de una fecha como lista de (nombre_base, datos)"""
+        return [(nombre_base, self.entrenamientos[nombre_base])
+                for nombre_base in self.por_fecha.get(fecha, ())]
+
+    def registrar_archivo(self, ruta_archivo):
+        """Actualiza el índice tras escribir un archivo sin reescanear el directorio"""
+        nombre_base = os.path.splitext(os.path.basename(ruta_archivo))[0]
+        almacen = Almacen.activo()
+        if almacen:
+            guardado = almacen.entrenamiento(nombre_base)
+            if guardado is None:
+                self._quitar(nombre_base)
+            else:
+                self._indexar(nombre_base, guardado[0], guardado[1])
+            return
+        try:
+            stat = os.stat(ruta_archivo)
+        except OSError:
+            self._quitar(nombre_base)
+            return
+        self._cargar(nombre_base, ruta_archivo, (stat.st_mtime_ns, stat.st_size))
+
+    def _cargar(self, nombre_base, ruta_archivo, firma):
+        """Lee un archivo de entrenamiento y lo guarda en el índice"""
+        self._indexar(nombre_base, self._leer_archivo(ruta_archivo), firma)
+
+    @staticmethod
+    def _leer_archivo(ruta_archivo):
+        """Devuelve los datos de un archivo de entrenamiento, o None si está dañado"""
+        try:
+            with open(ruta_archivo, "r", encoding="utf-8") as f:
+                datos = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return datos if isinstance(datos, dict) else None
+
+    def _indexar(self, nombre_base, datos, firma):
+        """Guarda en el índice un entrenamiento ya leído (None si está dañado)"""
+        # La firma se registra aunque el archivo esté dañado para no reintentarlo
+        # en cada escaneo mientras no cambie
+        self._firmas[nombre_base] = firma
+        self._quitar_de_series(nombre_base)
+        self._quitar_de_fechas(nombre_base)
+        if datos is None:
+            self.entrenamientos.pop(nombre_base, None)
+            return
+        self.entrenamientos[nombre_base] = datos
+        self._agregar_a_series(nombre_base, datos)
+        insort(self.por_fecha.setdefault(nombre_base.split('_')[0], []), nombre_base)
+
+    def _quitar(self, nombre_base):
+        """Elimina un entrenamiento del índice"""
+        self._quitar_de_series(nombre_base)
+        self._quitar_de_fechas(nombre_base)
+        self._firmas.pop(nombre_base, None)
+        self.entrenamientos.pop(nombre_base, None)
+
+    @staticmethod
+    def _ejercicios_de(datos):
+        """Devuelve la primera aparición de cada ejercicio de un entrenamiento"""
+        vistos = {}
+        for ej in datos.get('ejercicios', []):
+            if not isinstance(ej, dict):
+                continue
+            nombre = ej.get('ejercicio')
+            if nombre and nombre not in vistos:
+                vistos[nombre] = ej
+        return vistos
+
+    def _agregar_a_series(self, nombre_base, datos):
+        """Añade los ejercicios de un entrenamiento a las series por ejercicio"""
+        try:
+            fecha = date.fromisoformat(nombre_base.split('_')[0])
+        except ValueError:
+            return
+
+        for nombre, ej in self._ejercicios_de(datos).items():
+            # El ejercicio aparece en la lista aunque su peso no sea numérico
+            self.ejercicios[nombre] = self.ejercicios.get(nombre, 0) + 1
+            peso = _a_numero(ej.get('peso'), float)
+            if peso is None:
+                continue
+            self.series.setdefault(nombre, SerieEjercicio()).agregar(
+                (fecha, nombre_base),
+                peso,
+                _a_numero(ej.get('repeticiones'), int) or 0,
+                _a_numero(ej.get('series'), int) or 0
+            )
+
+    def _quitar_de_series(self, nombre_base):
+        """Quita de las series los ejercicios de la versión anterior del entrenamiento"""
+        datos = self.entrenamientos.get(nombre_base)
+        if not datos:
+            return
+        try:
+            fecha = date.fromisoformat(nombre_base.split('_')[0])
+        except ValueError:
+            return
+
+        for nombre in self._ejercicios_de(datos):
+            if self.ejercicios.get(nombre, 0) > 1:
+                self.ejercicios[nombre] -= 1
+            else:
+                self.ejercicios.pop(nombre, None)
+            serie = self.series.get(nombre)
+            if serie is None:
+                continue
+            serie.quitar((fecha, nombre_base))
+            if not serie:
+                del self.series[nombre]
+
+    def _quitar_de_fechas(self, nombre_base):
+        """Quita un entrenamiento del índice por fecha"""
+        fecha = nombre_base.split('_')[0]
+        sesiones = self.por_fecha.get(fecha)
+        if sesiones and nombre_base in sesiones:
+            sesiones.remove(nombre_base)
+            if not sesiones:
+                del self.por_fecha[fecha]
+
+
+class BitacoraPeso:
+    """Registro de peso corporal en un único archivo JSONL de solo anexado.
+
+    Cada línea es un registro completo; si hay varios para la misma fecha vale
+    el último. Los antiguos archivos peso_YYYY-MM-DD.json se migran al abrirla.
+    """
+
+    NOMBRE_ARCHIVO = "peso.jsonl"
+    CARPETA_MIGRADOS = "migrados"
+
+    _compartidas = {}
+    _bloqueo_compartidas = threading.Lock()  # Una sola bitácora (y un solo bloqueo) por archivo
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.ruta_archivo = os.path.join(ruta, self.NOMBRE_ARCHIVO)
+        self.por_fecha = {}         # "YYYY-MM-DD" -> registro
+        self._desplazamiento = 0    # bytes ya leídos del archivo
+        self._linea_incompleta = False
+        self._ultimo_id = 0         # último pesaje leído del almacén SQLite
+        self._bloqueo = threading.RLock()  # La primera lectura puede hacerse en otro hilo
+
+    @classmethod
+    def compartida(cls, ruta):
+        """Devuelve la bitácora del proceso para la ruta indicada (la crea si no existe)"""
+        clave = os.path.abspath(ruta)
+        if clave not in cls._compartidas:
+            with cls._bloqueo_compartidas:
+                if clave not in cls._compartidas:
+                    cls._compartidas[clave] = cls(ruta)
+        return cls._compartidas[clave]
+
+    def cargar(self):
+        """Lee los registros nuevos del archivo (solo lo añadido desde la última lectura)"""
+        with self._bloqueo:
+            almacen = Almacen.activo()
+            if almacen:
+                registros, self._ultimo_id = almacen.pesajes_desde(self._ultimo_id)
+                for registro in registros:
+                    self.por_fecha[registro['fecha']] = registro
+                return self.por_fecha
+            self._migrar_archivos_diarios()
+            return self._leer_nuevos()
+
+    def _leer_nuevos(self):
+        """Lee secuencialmente lo que haya después del último desplazamiento leído"""
+        try:
+            tamano = os.path.getsize(self.ruta_archivo)
+        except OSError:
+            self.por_fecha.clear()
+            self._desplazamiento = 0
+            return self.por_fecha
+
+        if tamano < self._desplazamiento:
+            # El archivo se reescribió por fuera de la aplicación: leerlo completo
+            self.por_fecha.clear()
+            self._desplazamiento = 0
+
+        if tamano > self._desplazamiento:
+            with open(self.ruta_archivo, "rb") as f:
+                f.seek(self._desplazamiento)
+                bloque = f.read()
+            # Una última línea sin salto quedó a medio escribir: se ignora
+            completo = bloque.rfind(b"\n") + 1
+            self._linea_incompleta = completo < len(bloque)
+            for registro in self._decodificar(bloque[:completo]):
+                self.por_fecha[registro['fecha']] = registro
+            self._desplazamiento += completo
+
+        return self.por_fecha
+
+    def registros(self):
+        """Devuelve los registros ordenados por fecha (uno por día)"""
+        with self._bloqueo:
+            self.cargar()
+            return [self.por_fecha[fecha] for fecha in sorted(self.por_fecha)]
+
+    def ultimos(self, cantidad):
+        """Lee desde el final del archivo los últimos registros anexados"""
+        if cantidad <= 0:
+            return []
+        almacen = Almacen.activo()
+        if almacen:
+            return almacen.ultimos_pesajes(cantidad)
+        try:
+            f = open(self.ruta_archivo, "rb")
+        except OSError:
+            return []
+
+        with f:
+            f.seek(0, os.SEEK_END)
+            posicion = f.tell()
+            bloque = b""
+            # Retroceder por bloques hasta tener suficientes líneas completas
+            while posicion > 0 and bloque.count(b"\n") <= cantidad:
+                paso = min(4096, posicion)
+                posicion -= paso
+                f.seek(posicion)
+                bloque = f.read(paso) + bloque
+
+        lineas = bloque[:bloque.rfind(b"\n") + 1].splitlines()
+        if posicion > 0:
+            lineas = lineas[1:]  # La primera línea puede estar cortada
+        return self._decodificar(b"\n".join(lineas[-cantidad:]))
+
+    def agregar(self, registro, al_terminar=None):
+        """Anexa un registro al final del archivo usando la cola de guardado
+
+        El registro queda disponible en memoria al instante; la próxima lectura
+        incremental vuelve a leer la línea ya escrita, lo que no altera el
+        resultado porque para cada fecha vale el último registro.
+        """
+        with self._bloqueo:
+            almacen = Almacen.activo()
+            if almacen:
+                almacen.guardar_pesaje(registro, al_terminar)
+                self.por_fecha[registro['fecha']] = registro
+                return self.ruta_archivo
+            os.makedirs(self.ruta, exist_ok=True)
+            self.cargar()
+            linea = json.dumps(registro, ensure_ascii=False, separators=(",", ":")) + "\n"
+            if self._linea_incompleta:
+                linea = "\n" + linea
+                self._linea_incompleta = False
+            cola_guardado.anexar(self.ruta_archivo, linea, al_terminar)
+            self.por_fecha[registro['fecha']] = registro
+            return self.ruta_archivo
+
+    def _anexar(self, datos):
+        """Escribe bytes al final del archivo
+
+        El desplazamiento no se mueve: la siguiente lectura incremental empieza
+        en el último salto de línea ya leído, así que también recoge lo que otro
+        escritor haya anexado entretanto y nunca arranca a mitad de una línea.
+        """
+        with open(self.ruta_archivo, "ab") as f:
+            f.write(datos)
+            f.flush()
+            os.fsync(f.fileno())
+
+    @staticmethod
+    def _decodificar(bloque):
+        """Convierte un bloque de líneas JSON en registros, saltando las dañadas"""
+        registros = []
+        for linea in bloque.splitlines():
+            try:
+                registro = json.loads(linea)
+            except ValueError:
+                continue
+            if isinstance(registro, dict) and 'fecha' in registro:
+                registros.append(registro)
+        return registros
+
+    def _migrar_archivos_diarios(self):
+        """Pasa los antiguos peso_YYYY-MM-DD.json a la bitácora y los aparta"""
+        if not os.path.isdir(self.ruta):
+            return
+        antiguos = sorted(
+            archivo for archivo in os.listdir(self.ruta)
+            if archivo.startswith("peso_") and archivo.endswith(".json")
+        )
+        if not antiguos:
+            return
+
+        lineas = []
+        migrados = []
+        for archivo in antiguos:
+            try:
+                with open(os.path.join(self.ruta, archivo), "r", encoding="utf-8") as f:
+                    registro = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if isinstance(registro, dict) and 'fecha' in registro:
+                lineas.append(json.dumps(registro, ensure_ascii=False, separators=(",", ":")))
+                migrados.append(archivo)
+
+        if lineas:
+            # Los anexados de la cola van antes, para saber si queda una línea cortada
+            cola_guardado.vaciar()
+            self._leer_nuevos()
+            prefijo = "\n" if self._linea_incompleta else ""
+            self._anexar((prefijo + "\n".join(lineas) + "\n").encode("utf-8"))
+            self._leer_nuevos()
+
+        carpeta_migrados = os.path.join(self.ruta, self.CARPETA_MIGRADOS)
+        os.makedirs(carpeta_migrados, exist_ok=True)
+        for archivo in migrados:
+            try:
+                os.replace(os.path.join(self.ruta, archivo), os.path.join(carpeta_migrados, archivo))
+            except OSError:
+                continue
@@ -1,10 +1,299 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-from datetime import datetime
+from datetime import datetime, date, timedelta
 import os
 import sys
+import hashlib
+import mmap
+import codecs
 from assets.estilos.styles import Styles
 from assets.estilos.styles import ToolTip
+from assets.estilos.lista_virtual import ListaVirtual
+from modules.busqueda import IndiceInvertido, mostrar_resultados
+from modules.persistencia import cola_guardado
+from modules.instrumentacion import obtener_logger, cronometrar
+from modules.almacen import Almacen
+from modules.linea_tiempo import LineaDeTiempo
+
+log = obtener_logger("diario")
+
+RUTA_INDICE_BUSQUEDA = os.path.join("Registros", ".cache", "indice_diario.json")
+
+# Milisegundos sin escribir antes de guardar automáticamente
+RETRASO_AUTOGUARDADO = 2000
+
+# Bytes leídos del principio de cada nota para obtener su cabecera
+TAMANO_CABECERA = 1024
+CAMPOS_CABECERA = {"Sección": "seccion", "Título": "titulo", "Fecha": "fecha"}
+
+# Las notas más grandes se cargan por bloques para no congelar el editor
+UMBRAL_NOTA_GRANDE = 1024 * 1024       # bytes
+TAMANO_BLOQUE_CARGA = 256 * 1024       # bytes (o caracteres en el almacén) por bloque
+TAMANO_PREFIJO_CODIFICACION = 64 * 1024
+
+# Rangos de la línea de tiempo (el personalizado usa las fechas escritas a mano)
+RANGOS_LINEA_TIEMPO = ("Semana", "Mes", "Año", "Personalizado")
+
+# Cabeceras ya leídas: ruta -> (firma, cabecera)
+_cabeceras = {}
+
+
+def titulo_desde_archivo(nombre_archivo):
+    """Extrae el título de un nombre "YYYY-MM-DD_HH-MM-SS_titulo.txt"""
+    partes = nombre_archivo.split('_')
+    if len(partes) > 2:  # Si sigue el formato fecha_titulo.txt
+        return ' '.join(partes[2:]).replace('.txt', '')
+    return nombre_archivo.replace('.txt', '')
+
+
+def cabecera_de_texto(texto):
+    """Extrae los campos de las líneas "Sección:", "Título:" y "Fecha:" del inicio de una nota"""
+    cabecera = {}
+    for linea in texto.split("\n"):
+        clave, separador, valor = linea.rstrip("\r").partition(":")
+        if not separador or clave not in CAMPOS_CABECERA:
+            break  # Fin de la cabecera (o nota sin cabecera)
+        cabecera[CAMPOS_CABECERA[clave]] = valor.strip()
+    return cabecera
+
+
+def leer_cabecera(ruta_nota, firma):
+    """Lee solo el bloque inicial de una nota; se reutiliza mientras la firma no cambie"""
+    guardada = _cabeceras.get(ruta_nota)
+    if guardada and guardada[0] == firma:
+        return guardada[1]
+    with open(ruta_nota, "rb") as f:
+        bloque = f.read(TAMANO_CABECERA)
+    if len(bloque) == TAMANO_CABECERA:
+        bloque = bloque[:bloque.rfind(b"\n") + 1]  # Sin la última línea cortada
+    try:
+        texto = bloque.decode("utf-8")
+    except UnicodeDecodeError:
+        texto = bloque.decode("latin-1")
+    cabecera = cabecera_de_texto(texto)
+    _cabeceras[ruta_nota] = (firma, cabecera)
+    return cabecera
+
+
+def huella_nota(titulo, contenido):
+    """Resume título y cuerpo en un hash para saber si la nota cambió"""
+    return hashlib.sha1(f"{titulo}\0{contenido}".encode("utf-8")).hexdigest()
+
+
+def cuerpo_de_nota(contenido):
+    """Devuelve el texto de la nota sin las líneas de metadatos"""
+    if "Sección:" in contenido and "Título:" in contenido and "Fecha:" in contenido:
+        # Formato con metadatos (separados por doble salto de línea)
+        partes = contenido.split("\n\n", 1)
+        if len(partes) > 1:
+            return partes[1].strip()  # Contenido después de metadatos
+    return contenido.strip()
+
+
+def partes_de_ruta(ruta_nota):
+    """Devuelve (sección, nombre de archivo) de la ruta de una nota"""
+    ruta_nota = os.path.normpath(ruta_nota)
+    return os.path.basename(os.path.dirname(ruta_nota)), os.path.basename(ruta_nota)
+
+
+def listar_secciones():
+    """Lista las secciones del diario (las carpetas ocultas como ".cache" son internas)"""
+    almacen = Almacen.activo()
+    if almacen:
+        return almacen.secciones()
+    if not os.path.exists("Registros"):
+        return []
+    return sorted([d for d in os.listdir("Registros")
+                   if not d.startswith(".") and os.path.isdir(os.path.join("Registros", d))])
+
+
+def listar_notas(seccion):
+    """Lista (archivo, cabecera) de las notas de una sección, de la última modificada a la primera
+
+    Solo se lee la cabecera de cada nota; el cuerpo se carga al abrirla.
+    """
+    almacen = Almacen.activo()
+    if almacen:
+        return [(archivo, cabecera_de_texto(inicio))
+                for archivo, inicio, _ in almacen.cabeceras_notas(seccion, TAMANO_CABECERA)]
+
+    ruta_seccion = os.path.join("Registros", seccion)
+    if not seccion or not os.path.isdir(ruta_seccion):
+        podar_cabeceras(ruta_seccion, ())
+        return []
+    notas = []
+    rutas = set()
+    with os.scandir(ruta_seccion) as entradas:
+        for entrada in entradas:
+            if not entrada.name.endswith(".txt") or not entrada.is_file():
+                continue
+            try:
+                stat = entrada.stat()
+                cabecera = leer_cabecera(entrada.path, (stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                continue
+            notas.append((stat.st_mtime_ns, entrada.name, cabecera))
+            rutas.add(entrada.path)
+    podar_cabeceras(ruta_seccion, rutas)
+    notas.sort(reverse=True)
+    return [(archivo, cabecera) for _, archivo, cabecera in notas]
+
+
+def podar_cabeceras(ruta_seccion, vigentes):
+    """Olvida las cabeceras de notas de la sección que ya no existen (borradas o renombradas)"""
+    for ruta in [ruta for ruta in _cabeceras
+                 if os.path.dirname(ruta) == ruta_seccion and ruta not in vigentes]:
+        del _cabeceras[ruta]
+
+
+def titulo_de_nota(nombre_archivo, cabecera):
+    """Título real de la nota (el de la cabecera si existe, si no el del nombre de archivo)"""
+    return cabecera.get("titulo") or titulo_desde_archivo(nombre_archivo)
+
+
+def leer_nota(ruta_nota):
+    """Devuelve el texto completo de una nota (FileNotFoundError si no existe)"""
+    almacen = Almacen.activo()
+    if almacen:
+        nota = almacen.nota(*partes_de_ruta(ruta_nota))
+        if nota is None:
+            raise FileNotFoundError(ruta_nota)
+        return nota[0]
+    # Leer el archivo con manejo explícito de encoding
+    try:
+        with open(ruta_nota, "r", encoding="utf-8") as f:
+            return f.read()
+    except UnicodeDecodeError:
+        # Intentar con otro encoding si utf-8 falla
+        with open(ruta_nota, "r", encoding="latin-1") as f:
+            return f.read()
+
+
+def es_nota_grande(ruta_nota):
+    """Indica si la nota supera el tamaño a partir del cual se carga por bloques"""
+    firma = firma_nota(ruta_nota)
+    return firma is not None and firma[1] > UMBRAL_NOTA_GRANDE
+
+
+def detectar_codificacion(prefijo):
+    """Elige utf-8 o latin-1 a partir del principio del archivo (una sola vez)"""
+    try:
+        # final=False tolera un carácter cortado al final del prefijo
+        codecs.getincrementaldecoder("utf-8")().decode(prefijo, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "latin-1"
+
+
+def trozos_de_nota(ruta_nota, codificacion=None):
+    """Genera el texto de una nota por bloques; el archivo se lee con un mapa de memoria
+
+    Sin codificación se elige a partir del principio del archivo. El
+    decodificador es estricto: si más adelante aparecen bytes que no son utf-8
+    lanza UnicodeDecodeError para que la carga vuelva a empezar como latin-1,
+    igual que leer_nota, en lugar de sustituirlos y perderlos al guardar.
+    """
+    almacen = Almacen.activo()
+    if almacen:
+        nota = almacen.nota(*partes_de_ruta(ruta_nota))
+        if nota is None:
+            raise FileNotFoundError(ruta_nota)
+        for inicio in range(0, len(nota[0]), TAMANO_BLOQUE_CARGA):
+            yield nota[0][inicio:inicio + TAMANO_BLOQUE_CARGA]
+        return
+
+    with open(ruta_nota, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+        codificacion = codificacion or detectar_codificacion(mapa[:TAMANO_PREFIJO_CODIFICACION])
+        # El decodificador incremental une los caracteres partidos entre bloques
+        decodificador = codecs.getincrementaldecoder(codificacion)()
+        for inicio in range(0, len(mapa), TAMANO_BLOQUE_CARGA):
+            yield decodificador.decode(mapa[inicio:inicio + TAMANO_BLOQUE_CARGA])
+        yield decodificador.decode(b"", final=True)
+
+
+def firma_nota(ruta_nota):
+    """Devuelve la firma (modificación, tamaño) de una nota, o None si no existe"""
+    almacen = Almacen.activo()
+    if almacen:
+        nota = almacen.nota(*partes_de_ruta(ruta_nota))
+        return (nota[1], len(nota[0])) if nota else None
+    try:
+        stat = os.stat(ruta_nota)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def borrar_nota(ruta_nota):
+    """Elimina una nota del disco o del almacén"""
+    almacen = Almacen.activo()
+    if almacen:
+        almacen.eliminar_nota(*partes_de_ruta(ruta_nota))
+    else:
+        os.remove(ruta_nota)
+    _cabeceras.pop(ruta_nota, None)
+
+
+def archivos_diario():
+    """Lista las notas de todas las secciones como doc_id -> (ruta, firma)"""
+    archivos = {}
+    almacen = Almacen.activo()
+    if almacen:
+        for doc_id, firma in almacen.firmas_notas().items():
+            archivos[doc_id] = (os.path.join("Registros", *doc_id.split("/", 1)), firma)
+        return archivos
+    if not os.path.isdir("Registros"):
+        return archivos
+    with os.scandir("Registros") as secciones:
+        for seccion in secciones:
+            if seccion.name.startswith(".") or not seccion.is_dir():
+                continue
+            with os.scandir(seccion.path) as notas:
+                for nota in notas:
+                    if not nota.name.endswith(".txt") or not nota.is_file():
+                        continue
+                    stat = nota.stat()
+                    archivos[f"{seccion.name}/{nota.name}"] = (nota.path, (stat.st_mtime_ns, stat.st_size))
+    return archivos
+
+
+def doc_ids_diario():
+    """Lista los doc_id "seccion/archivo" de todas las notas solo con los nombres (sin stat)"""
+    doc_ids = []
+    if not os.path.isdir("Registros"):
+        return doc_ids
+    with os.scandir("Registros") as secciones:
+        for seccion in secciones:
+            if seccion.name.startswith(".") or not seccion.is_dir():
+                continue
+            doc_ids.extend(f"{seccion.name}/{archivo}" for archivo in os.listdir(seccion.path)
+                           if archivo.endswith(".txt"))
+    return doc_ids
+
+
+def cabecera_de_nota(ruta_nota):
+    """Cabecera de una nota suelta (vacía si ya no existe)"""
+    firma = firma_nota(ruta_nota)
+    if firma is None:
+        return {}
+    try:
+        return leer_cabecera(ruta_nota, firma)
+    except OSError:
+        return {}
+
+
+def leer_nota_para_indice(ruta, doc_id):
+    """Convierte una nota en bloques (texto, peso, línea) para el índice de búsqueda"""
+    contenido = leer_nota(ruta)
+    seccion, nombre_archivo = doc_id.split("/", 1)
+    titulo = titulo_de_nota(nombre_archivo, cabecera_de_texto(contenido))
+
+    # El título pesa más que el cuerpo; las líneas coinciden con las del editor
+    bloques = [(titulo, 3.0, 1)]
+    for numero, linea in enumerate(cuerpo_de_nota(contenido).split("\n"), start=1):
+        bloques.append((linea, 1.0, numero))
+    return bloques, {"seccion": seccion, "titulo": titulo}
+
 
 class DiarioApp:
     def __init__(self, root):
@@ -22,6 +311,23 @@ class DiarioApp:
         self.nueva_seccion = tk.StringVar()
         self.nota_actual = tk.StringVar()
         self.titulo_actual = tk.StringVar()
+        self.rutas_notas = []  # Ruta de la nota mostrada en cada fila de lista_notas
+        self.consulta_busqueda = tk.StringVar()
+        self.resultados_busqueda = []  # (doc_id, línea) por fila de la lista de resultados
+        self.huella_guardada = None  # Hash del título y cuerpo escritos en disco
+        self.rango_linea_tiempo = tk.StringVar(value="Mes")
+        self.desde_linea_tiempo = tk.StringVar()
+        self.hasta_linea_tiempo = tk.StringVar()
+        self.linea_tiempo = LineaDeTiempo.compartida()
+        self.autoguardado_pendiente = None
+        self.carga_pendiente = None  # after() del siguiente bloque de una nota grande
+        self.trozos_carga = None
+        
+        # Índice de búsqueda compartido (se sincroniza en la primera búsqueda)
+        self.indice_busqueda = IndiceInvertido.compartido(RUTA_INDICE_BUSQUEDA)
+        
+        # Las confirmaciones de guardado llegan por el bucle de eventos de esta ventana
+        cola_guardado.conectar(self.root)
         
         # Crear estructura de widgets
         self.setup_ui()
@@ -53,6 +359,74 @@ class DiarioApp:
         panel_izquierdo.grid(row=0, column=0, rowspan=2, sticky="nswe", padx=6, pady=5)
         panel_izquierdo.pack_propagate(False)
         
+        # Frame para la búsqueda en todas las notas
+        frame_busqueda = ttk.LabelFrame(panel_izquierdo, text="Buscar", style="Custom.TLabelframe")
+        frame_busqueda.pack(fill="x", pady=5)
+        
+        frame_consulta = ttk.Frame(frame_busqueda, style="Custom.TFrame")
+        frame_consulta.pack(fill="x", pady=5)
+        
+        entry_busqueda = ttk.Entry(
+            frame_consulta,
+            textvariable=self.consulta_busqueda,
+            style="Custom.TEntry"
+        )
+        entry_busqueda.pack(side="left", fill="x", expand=True, padx=5)
+        entry_busqueda.bind("<Return>", lambda e: self.buscar_notas())
+        
+        ttk.Button(
+            frame_consulta,
+            text="🔍",
+            style="Custom.TButton",
+            command=self.buscar_notas,
+            width=3
+        ).pack(side="right", padx=5)
+        
+        self.lista_resultados = tk.Listbox(
+            frame_busqueda,
+            bg=Styles.COLOR_BACKGROUND,
+            fg=Styles.COLOR_TEXT,
+            selectbackground=Styles.COLOR_PRIMARY,
+            font=Styles.FONT,
+            borderwidth=0,
+            highlightthickness=0,
+            selectmode=tk.SINGLE,
+            height=5
+        )
+        self.lista_resultados.pack(fill="x")
+        self.lista_resultados.bind("<<ListboxSelect>>", self.on_resultado_seleccionado)
+        
+        # Línea de tiempo de todas las secciones (usa la misma lista de resultados)
+        frame_linea = ttk.LabelFrame(panel_izquierdo, text="Línea de tiempo", style="Custom.TLabelframe")
+        frame_linea.pack(fill="x", pady=5)
+        
+        combo_rango = ttk.Combobox(
+            frame_linea,
+            textvariable=self.rango_linea_tiempo,
+            values=RANGOS_LINEA_TIEMPO,
+            state="readonly",
+            width=14
+        )
+        combo_rango.pack(fill="x", padx=5, pady=(5, 0))
+        combo_rango.bind("<<ComboboxSelected>>", lambda e: self.on_rango_seleccionado())
+        
+        frame_fechas = ttk.Frame(frame_linea, style="Custom.TFrame")
+        frame_fechas.pack(fill="x", pady=5)
+        
+        for variable in (self.desde_linea_tiempo, self.hasta_linea_tiempo):
+            entry_fecha = ttk.Entry(frame_fechas, textvariable=variable, style="Custom.TEntry", width=10)
+            entry_fecha.pack(side="left", fill="x", expand=True, padx=(5, 0))
+            entry_fecha.bind("<Return>", lambda e: self.mostrar_linea_tiempo())
+        
+        ttk.Button(
+            frame_fechas,
+            text="Ver",
+            style="Custom.TButton",
+            command=self.mostrar_linea_tiempo,
+            width=4
+        ).pack(side="right", padx=5)
+        self.on_rango_seleccionado(mostrar=False)
+        
         # Frame para secciones
         frame_secciones_container = ttk.Frame(panel_izquierdo, style="Custom.TFrame")
         frame_secciones_container.pack(fill="x", pady=5)
@@ -88,7 +462,8 @@ class DiarioApp:
         - Tu nota quedará almacenada en la sección correspondiente.
         
          👀OJO (Enfoque del 100%)
-        - El navegar por otras notas no guarda los cambios automáticamente.
+        - Los cambios se guardan solos unos segundos después de dejar de escribir
+          y al pasar a otra nota o sección (si la nota tiene título y contenido).
         - Usa el botón "💾 Guardar" para guardar los cambios en la nota actual.
         
         """
@@ -131,16 +506,13 @@ class DiarioApp:
         frame_notas = ttk.LabelFrame(panel_izquierdo, text="Notas", style="Custom.TLabelframe")
         frame_notas.pack(fill="both", expand=True, pady=5)
         
-        # Lista de notas
-        self.lista_notas = tk.Listbox(
+        # Lista de notas (solo dibuja las filas visibles)
+        self.lista_notas = ListaVirtual(
             frame_notas,
             bg=Styles.COLOR_BACKGROUND,
             fg=Styles.COLOR_TEXT,
             selectbackground=Styles.COLOR_PRIMARY,
-            font=Styles.FONT,
-            borderwidth=0,
-            highlightthickness=0,
-            selectmode=tk.SINGLE
+            font=Styles.FONT
         )
         self.lista_notas.pack(fill="both", expand=True)
         self.lista_notas.bind("<<ListboxSelect>>", self.on_nota_seleccionada)
@@ -200,6 +572,10 @@ class DiarioApp:
         )
         self.text_contenido.configure(xscrollcommand=scroll_x.set)
         
+        # Autoguardado: cada modificación del texto o del título reinicia la espera
+        self.text_contenido.bind("<<Modified>>", self.on_texto_modificado)
+        self.titulo_actual.trace_add("write", lambda *args: self.programar_autoguardado())
+        
         # Posicionamiento
         self.text_contenido.grid(row=0, column=0, sticky="nsew")
         scroll_y.grid(row=0, column=1, sticky="ns")
@@ -239,15 +615,15 @@ class DiarioApp:
             os.makedirs("Registros")
         if not os.path.exists(os.path.join("Registros", "General")):
             os.makedirs(os.path.join("Registros", "General"))
+        almacen = Almacen.activo()
+        if almacen:
+            almacen.crear_seccion("General")
 
     def actualizar_lista_secciones(self):
         """Actualiza la lista de secciones disponibles"""
         self.lista_secciones.delete(0, tk.END)
-        if os.path.exists("Registros"):
-            secciones = sorted([d for d in os.listdir("Registros") 
-                              if os.path.isdir(os.path.join("Registros", d))])
-            for seccion in secciones:
-                self.lista_secciones.insert(tk.END, seccion)
+        for seccion in listar_secciones():
+            self.lista_secciones.insert(tk.END, seccion)
         
         # Seleccionar la primera sección si existe
         if self.lista_secciones.size() > 0:
@@ -257,23 +633,36 @@ class DiarioApp:
 
     def actualizar_lista_notas(self):
         """Actualiza la lista de notas para la sección actual"""
-        self.lista_notas.delete(0, tk.END)
-        if not self.seccion_actual.get():
-            return
-            
+        titulos = []
+        self.rutas_notas = []
         ruta_seccion = os.path.join("Registros", self.seccion_actual.get())
-        if os.path.exists(ruta_seccion):
-            notas = sorted([f for f in os.listdir(ruta_seccion) 
-                          if f.endswith(".txt")], reverse=True)
-            for nota in notas:
-                # Mostrar solo el título (eliminando fecha y extensión)
-                titulo = " ".join(nota.split("_")[2:]).replace(".txt", "")
-                self.lista_notas.insert(tk.END, titulo)
+        for nota, cabecera in listar_notas(self.seccion_actual.get()):
+            # Título y fecha de la última modificación según la cabecera
+            titulo = titulo_de_nota(nota, cabecera)
+            fecha = cabecera.get("fecha", "")[:10]
+            titulos.append(f"{titulo} · {fecha}" if fecha else titulo)
+            self.rutas_notas.append(os.path.join(ruta_seccion, nota))
+        
+        # Se reemplazan todas las filas de una vez
+        self.lista_notas.set_items(titulos)
+    
+    def refrescar_lista_notas(self):
+        """Vuelve a leer las filas conservando el desplazamiento y la nota abierta seleccionada"""
+        vista = self.lista_notas.yview()[0]
+        self.actualizar_lista_notas()
+        self.lista_notas.yview("moveto", vista)
+        abierta = os.path.abspath(self.nota_actual.get()) if self.nota_actual.get() else None
+        for index, ruta in enumerate(self.rutas_notas):
+            if os.path.abspath(ruta) == abierta:
+                self.lista_notas.selection_set(index)
+                self.lista_notas.activate(index)
+                break
     
     def on_seccion_seleccionada(self, event=None):
         """Maneja la selección de una sección"""
         seleccion = self.lista_secciones.curselection()
         if seleccion:
+            self.autoguardar_ahora()  # Antes de cambiar la sección de destino
             self.seccion_actual.set(self.lista_secciones.get(seleccion[0]))
             self.actualizar_lista_notas()
             self.nueva_nota()  # Limpiar editor al cambiar de sección
@@ -281,28 +670,19 @@ class DiarioApp:
     def on_nota_seleccionada(self, event=None):
         """Maneja la selección de una nota"""
         seleccion = self.lista_notas.curselection()
-        if not seleccion or not self.seccion_actual.get():
+        if not seleccion or seleccion[0] >= len(self.rutas_notas):
             return
             
-        # Obtener el nombre del archivo seleccionado
-        titulo_nota = self.lista_notas.get(seleccion[0])
-        ruta_seccion = os.path.join("Registros", self.seccion_actual.get())
-        
-        # Buscar el archivo correspondiente (puede haber múltiples con el mismo título)
-        for archivo in os.listdir(ruta_seccion):
-            if titulo_nota in archivo and archivo.endswith(".txt"):
-                self.cargar_nota(os.path.join(ruta_seccion, archivo))
-                break
+        # Cada fila conoce la ruta exacta de su archivo (aunque se repitan títulos)
+        self.cargar_nota(self.rutas_notas[seleccion[0]])
 
     
+    @cronometrar("diario.cargar_nota")
     def cargar_nota(self, ruta_nota):
         """Carga una nota en el editor - Versión mejorada para .exe"""
+        self.autoguardar_ahora()
+        self.cancelar_carga()
         try:
-            # Debug: Mostrar información de rutas antes de empezar
-            print("\n--- Inicio carga de nota ---")
-            print(f"Ruta recibida: {ruta_nota}")
-            print(f"Directorio actual: {os.getcwd()}")
-            
             # Convertir a ruta absoluta de manera confiable
             if not os.path.isabs(ruta_nota):
                 base_dir = os.path.dirname(sys.executable) if getattr(sys, 'frozen', False) else os.getcwd()
@@ -310,72 +690,118 @@ class DiarioApp:
             
             # Normalizar la ruta (para evitar problemas con / vs \)
             ruta_nota = os.path.normpath(ruta_nota)
+            log.debug("Cargando nota %s", ruta_nota)
             
-            print(f"Ruta absoluta normalizada: {ruta_nota}")
+            if es_nota_grande(ruta_nota):
+                self.cargar_nota_por_bloques(ruta_nota)
+                return
             
-            # Verificar si el archivo existe realmente
-            if not os.path.exists(ruta_nota):
+            # Verificar si la nota existe realmente
+            try:
+                contenido = leer_nota(ruta_nota)
+            except FileNotFoundError:
                 error_msg = f"No se encontró el archivo:\n{ruta_nota}"
-                print(error_msg)
+                log.warning("No se encontró la nota %s", ruta_nota)
                 messagebox.showerror("Error", error_msg)
                 return
-                
-            # Leer el archivo con manejo explícito de encoding
-            try:
-                with open(ruta_nota, "r", encoding="utf-8") as f:
-                    contenido = f.read()
-            except UnicodeDecodeError:
-                # Intentar con otro encoding si utf-8 falla
-                with open(ruta_nota, "r", encoding="latin-1") as f:
-                    contenido = f.read()
-            
-            # Debug: Mostrar información del archivo
-            print(f"Archivo encontrado. Tamaño: {len(contenido)} caracteres")
-            print(f"Primeras líneas:\n{contenido[:200]}...")
             
-            # Extraer título del nombre del archivo de manera más robusta
-            nombre_archivo = os.path.basename(ruta_nota)
-            try:
-                # Intenta extraer el título después de la fecha
-                partes = nombre_archivo.split('_')
-                if len(partes) > 2:  # Si sigue el formato fecha_titulo.txt
-                    titulo = ' '.join(partes[2:]).replace('.txt', '')
-                else:
-                    titulo = nombre_archivo.replace('.txt', '')
-            except:
-                titulo = nombre_archivo.replace('.txt', '')
+            # Título de la cabecera (o del nombre del archivo si no la tiene)
+            titulo = titulo_de_nota(os.path.basename(ruta_nota), cabecera_de_texto(contenido))
             
-            # Actualizar la interfaz
+            # Actualizar la interfaz (con o sin líneas de metadatos)
+            cuerpo = cuerpo_de_nota(contenido)
             self.titulo_actual.set(titulo)
             self.text_contenido.delete("1.0", tk.END)
-            
-            # Manejar diferentes formatos de contenido
-            if "Sección:" in contenido and "Título:" in contenido and "Fecha:" in contenido:
-                # Formato con metadatos (separados por doble salto de línea)
-                partes = contenido.split("\n\n", 1)
-                if len(partes) > 1:
-                    self.text_contenido.insert("1.0", partes[1].strip())  # Contenido después de metadatos
-                else:
-                    self.text_contenido.insert("1.0", contenido.strip())
-            else:
-                # Formato simple sin metadatos
-                self.text_contenido.insert("1.0", contenido.strip())
+            self.text_contenido.insert("1.0", cuerpo)
+            self.huella_guardada = huella_nota(titulo, cuerpo)
                 
             # Guardar referencia a la nota actual
             self.nota_actual.set(ruta_nota)
-            print("--- Nota cargada exitosamente ---\n")
             
         except PermissionError:
             error_msg = f"No tienes permisos para leer el archivo:\n{ruta_nota}"
-            print(error_msg)
+            log.error("Sin permisos para leer la nota %s", ruta_nota)
             messagebox.showerror("Error de Permisos", error_msg)
         except Exception as e:
             error_msg = f"No se pudo cargar la nota:\n{str(e)}"
-            print(error_msg)
+            log.exception("No se pudo cargar la nota %s", ruta_nota)
             messagebox.showerror("Error", error_msg)
 
 
         
+    def cargar_nota_por_bloques(self, ruta_nota, codificacion=None):
+        """Muestra el principio de una nota grande al instante y añade el resto con after()"""
+        trozos = trozos_de_nota(ruta_nota, codificacion)
+        try:
+            primero = next(trozos, "")
+        except UnicodeDecodeError:
+            trozos = trozos_de_nota(ruta_nota, "latin-1")
+            primero = next(trozos, "")
+        
+        # La cabecera siempre cabe en el primer bloque
+        cabecera = cabecera_de_texto(primero)
+        if len(cabecera) == len(CAMPOS_CABECERA) and "\n\n" in primero:
+            primero = primero.split("\n\n", 1)[1]
+        titulo = titulo_de_nota(os.path.basename(ruta_nota), cabecera)
+        
+        self.titulo_actual.set(titulo)
+        self.text_contenido.delete("1.0", tk.END)
+        self.text_contenido.insert("1.0", primero.lstrip())
+        self.nota_actual.set(ruta_nota)
+        self.huella_guardada = None
+        
+        # Sin edición ni guardado hasta tener la nota completa
+        self.text_contenido.configure(state="disabled")
+        self.trozos_carga = trozos
+        self.carga_pendiente = self.root.after(1, lambda: self.continuar_carga(titulo))
+
+    def continuar_carga(self, titulo):
+        """Añade el siguiente bloque de la nota grande en carga"""
+        self.carga_pendiente = None
+        try:
+            trozo = next(self.trozos_carga)
+        except StopIteration:
+            self.terminar_carga(titulo)
+            return
+        except UnicodeDecodeError:
+            # utf-8 al principio y latin-1 más adelante: se recarga entera como latin-1
+            ruta_nota = self.nota_actual.get()
+            log.info("La nota %s no es utf-8 completa; se recarga como latin-1", ruta_nota)
+            self.trozos_carga = None
+            self.text_contenido.configure(state="normal")
+            self.cargar_nota_por_bloques(ruta_nota, "latin-1")
+            return
+        except (OSError, ValueError) as e:
+            log.exception("No se pudo terminar de cargar la nota %s", self.nota_actual.get())
+            # Vaciar el editor para no guardar una nota incompleta
+            self.cancelar_carga()
+            self.cancelar_autoguardado()
+            self.nueva_nota()
+            messagebox.showerror("Error", f"No se pudo cargar la nota:\n{str(e)}")
+            return
+        
+        self.text_contenido.configure(state="normal")
+        self.text_contenido.insert(tk.END, trozo)
+        self.text_contenido.configure(state="disabled")
+        self.carga_pendiente = self.root.after(1, lambda: self.continuar_carga(titulo))
+
+    def terminar_carga(self, titulo):
+        """Habilita la edición cuando la nota grande terminó de cargarse"""
+        self.trozos_carga = None
+        self.text_contenido.configure(state="normal")
+        self.text_contenido.edit_reset()
+        self.huella_guardada = huella_nota(titulo, self.text_contenido.get("1.0", tk.END).strip())
+
+    def cancelar_carga(self):
+        """Detiene la carga por bloques en curso (al cambiar de nota o cerrar)"""
+        if self.carga_pendiente is not None:
+            self.root.after_cancel(self.carga_pendiente)
+            self.carga_pendiente = None
+        if self.trozos_carga is not None:
+            self.trozos_carga.close()  # Cierra el mapa de memoria
+            self.trozos_carga = None
+            self.text_contenido.configure(state="normal")
+
     def crear_seccion(self):
         """Crea una nueva sección"""
         nombre = self.nueva_seccion.get().strip()
@@ -393,7 +819,11 @@ class DiarioApp:
             return
             
         try:
-            os.makedirs(os.path.join("Registros", nombre), exist_ok=True)
+            almacen = Almacen.activo()
+            if almacen:
+                almacen.crear_seccion(nombre)
+            else:
+                os.makedirs(os.path.join("Registros", nombre), exist_ok=True)
             messagebox.showinfo("Éxito", f"Sección '{nombre}' creada exitosamente!")
             self.nueva_seccion.set("")
             self.actualizar_lista_secciones()
@@ -412,16 +842,19 @@ class DiarioApp:
 
     def nueva_nota(self):
         """Prepara el editor para una nueva nota"""
+        self.autoguardar_ahora()
+        self.cancelar_carga()
+        self.huella_guardada = None
         self.titulo_actual.set("")
         self.text_contenido.delete("1.0", tk.END)
         self.nota_actual.set("")
         self.entry_titulo.focus_set()
 
+    @cronometrar("diario.guardar_nota")
     def guardar_nota(self):
         """Guarda la nota actual (nueva o existente)"""
         titulo = self.titulo_actual.get().strip()
         contenido = self.text_contenido.get("1.0", tk.END).strip()
-        seccion = self.seccion_actual.get()
         
         if not titulo:
             messagebox.showwarning("Error", "El título no puede estar vacío.")
@@ -430,11 +863,30 @@ class DiarioApp:
         if not contenido:
             messagebox.showwarning("Error", "El contenido no puede estar vacío.")
             return
-            
+        
+        if self.trozos_carga is not None:
+            messagebox.showinfo("Cargando", "Espera a que la nota termine de cargarse.")
+            return
+        
+        self.cancelar_autoguardado()
+        if not self.escribir_nota(titulo, contenido):
+            messagebox.showinfo("Sin cambios", "La nota no tiene cambios sin guardar.")
+
+    def escribir_nota(self, titulo, contenido, silencioso=False):
+        """Programa la escritura de la nota si el título o el cuerpo cambiaron
+
+        Devuelve False cuando la nota ya está guardada con ese mismo contenido.
+        """
+        huella = huella_nota(titulo, contenido)
+        seccion = self.seccion_actual.get()
+        
         # Determinar si es una nota nueva o existente
         ruta_nota = self.nota_actual.get()
         es_nueva = not ruta_nota
         
+        if not es_nueva and huella == self.huella_guardada:
+            return False
+        
         if es_nueva:
             # Crear nombre de archivo con timestamp
             fecha = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
@@ -442,31 +894,95 @@ class DiarioApp:
             nombre_archivo = "".join(c for c in nombre_archivo if c.isalnum() or c in ("_", "-", "."," "))
             ruta_nota = os.path.join("Registros", seccion, nombre_archivo)
         
-        try:
-            # Escribir archivo
-            with open(ruta_nota, "w", encoding="utf-8") as f:
-                f.write(f"Sección: {seccion}\n")
-                f.write(f"Título: {titulo}\n")
-                f.write(f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-                f.write(contenido)
+        texto = (
+            f"Sección: {seccion}\n"
+            f"Título: {titulo}\n"
+            f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
+            f"{contenido}"
+        )
+        
+        # La nota nueva queda asociada a su ruta desde ya: si se vuelve a guardar
+        # antes de que termine la escritura, se reemplaza el mismo archivo
+        if es_nueva:
+            self.nota_actual.set(ruta_nota)
+        self.huella_guardada = huella
+        
+        def al_terminar(error):
+            if error is not None:
+                if self.huella_guardada == huella:
+                    self.huella_guardada = None  # Reintentar en el próximo guardado
+                messagebox.showerror("Error", f"No se pudo guardar la nota:\n{str(error)}")
+                return
+            
+            self.actualizar_indice_nota(ruta_nota)
+            if not self.root.winfo_exists():
+                return  # La ventana se cerró mientras se escribía
             
             # Feedback al usuario
-            messagebox.showinfo("Éxito", "Nota guardada correctamente!")
+            if not silencioso:
+                messagebox.showinfo("Éxito", "Nota guardada correctamente!")
             
-            # Actualizar listas
-            if es_nueva:
+            # Actualizar listas (solo si se sigue viendo la misma sección)
+            if es_nueva and self.seccion_actual.get() == seccion:
+                if self.nota_actual.get() != ruta_nota:
+                    # Entretanto se abrió otra nota: añadir la fila sin cambiar la selección
+                    self.refrescar_lista_notas()
+                    return
                 self.actualizar_lista_notas()
                 # Seleccionar la nueva nota
-                items = self.lista_notas.get(0, tk.END)
-                if titulo in items:
-                    index = items.index(titulo)
+                if ruta_nota in self.rutas_notas:
+                    index = self.rutas_notas.index(ruta_nota)
                     self.lista_notas.selection_clear(0, tk.END)
                     self.lista_notas.selection_set(index)
                     self.lista_notas.activate(index)
-                    self.on_nota_seleccionada()
-            
+                    # El autoguardado no recarga el editor mientras se escribe
+                    if not silencioso:
+                        self.on_nota_seleccionada()
+        
+        try:
+            almacen = Almacen.activo()
+            if almacen:
+                almacen.guardar_nota(*partes_de_ruta(ruta_nota), texto, al_terminar)
+            else:
+                # Escribir archivo en segundo plano
+                cola_guardado.guardar(ruta_nota, texto, al_terminar)
         except Exception as e:
+            self.huella_guardada = None
             messagebox.showerror("Error", f"No se pudo guardar la nota:\n{str(e)}")
+        return True
+
+    def on_texto_modificado(self, event=None):
+        """Programa el autoguardado cuando cambia el texto de la nota"""
+        if self.text_contenido.edit_modified():
+            self.text_contenido.edit_modified(False)
+            self.programar_autoguardado()
+
+    def programar_autoguardado(self):
+        """Reinicia la espera del autoguardado tras una modificación"""
+        self.cancelar_autoguardado()
+        self.autoguardado_pendiente = self.root.after(RETRASO_AUTOGUARDADO, self.autoguardar)
+
+    def cancelar_autoguardado(self):
+        """Descarta el autoguardado programado, si lo hay"""
+        if self.autoguardado_pendiente is not None:
+            self.root.after_cancel(self.autoguardado_pendiente)
+            self.autoguardado_pendiente = None
+
+    def autoguardar(self):
+        """Guarda en silencio la nota si tiene título y contenido y cambió"""
+        self.autoguardado_pendiente = None
+        if self.trozos_carga is not None:
+            return  # Una nota a medio cargar no se guarda
+        titulo = self.titulo_actual.get().strip()
+        contenido = self.text_contenido.get("1.0", tk.END).strip()
+        if titulo and contenido:
+            self.escribir_nota(titulo, contenido, silencioso=True)
+
+    def autoguardar_ahora(self):
+        """Adelanta el autoguardado pendiente (antes de cambiar de nota o sección)"""
+        if self.autoguardado_pendiente is not None:
+            self.cancelar_autoguardado()
+            self.autoguardar()
 
     def eliminar_nota(self):
         """Elimina la nota actualmente seleccionada"""
@@ -483,10 +999,15 @@ class DiarioApp:
         
         if not confirmacion:
             return
+        
+        # Un autoguardado posterior (programado o ya en la cola) volvería a crear el archivo
+        self.cancelar_autoguardado()
+        cola_guardado.cancelar(self.nota_actual.get())
             
         try:
             # Eliminar el archivo
-            os.remove(self.nota_actual.get())
+            borrar_nota(self.nota_actual.get())
+            self.actualizar_indice_nota(self.nota_actual.get())
             
             # Feedback al usuario
             messagebox.showinfo("Éxito", "Nota eliminada correctamente")
@@ -498,6 +1019,119 @@ class DiarioApp:
         except Exception as e:
             messagebox.showerror("Error", f"No se pudo eliminar la nota:\n{str(e)}")
 
+    def buscar_notas(self):
+        """Busca la consulta en todas las notas y muestra los resultados ordenados"""
+        self.resultados_busqueda = mostrar_resultados(
+            self.lista_resultados, self.indice_busqueda,
+            self.consulta_busqueda.get().strip(),
+            archivos_diario, leer_nota_para_indice,
+            lambda meta: f"{meta['titulo']} — {meta['seccion']}"
+        )
+    
+    def on_rango_seleccionado(self, mostrar=True):
+        """Rellena las fechas del rango elegido (semana, mes o año en curso)"""
+        rango = self.rango_linea_tiempo.get()
+        if rango == "Personalizado":
+            return  # Se usan las fechas escritas
+        hoy = date.today()
+        if rango == "Semana":
+            desde = hoy - timedelta(days=hoy.weekday())
+        elif rango == "Año":
+            desde = hoy.replace(month=1, day=1)
+        else:
+            desde = hoy.replace(day=1)
+        self.desde_linea_tiempo.set(desde.isoformat())
+        self.hasta_linea_tiempo.set(hoy.isoformat())
+        if mostrar:
+            self.mostrar_linea_tiempo()
+
+    def mostrar_linea_tiempo(self):
+        """Muestra las notas de todas las secciones creadas entre las dos fechas (incluidas)"""
+        try:
+            desde = date.fromisoformat(self.desde_linea_tiempo.get().strip())
+            hasta = date.fromisoformat(self.hasta_linea_tiempo.get().strip())
+        except ValueError:
+            messagebox.showwarning("Error", "Las fechas deben tener el formato AAAA-MM-DD.")
+            return
+        
+        # El límite superior es el inicio del día siguiente
+        limites = (desde.isoformat(), (hasta + timedelta(days=1)).isoformat())
+        almacen = Almacen.activo()
+        if almacen:
+            # Consulta sobre el índice por fecha de la base de datos
+            notas = [(marca, f"{seccion}/{archivo}", cabecera_de_texto(inicio))
+                     for marca, seccion, archivo, inicio in almacen.notas_entre(*limites, TAMANO_CABECERA)]
+        else:
+            if not self.linea_tiempo.construida:
+                # La fecha sale del nombre de archivo: no hace falta consultar cada nota
+                self.linea_tiempo.construir(doc_ids_diario())
+            notas = [(marca, doc_id, cabecera_de_nota(os.path.join("Registros", *doc_id.split("/", 1))))
+                     for marca, doc_id in self.linea_tiempo.entre(*limites)]
+        
+        self.lista_resultados.delete(0, tk.END)
+        self.resultados_busqueda = []
+        for marca, doc_id, cabecera in notas:
+            seccion, nombre_archivo = doc_id.split("/", 1)
+            titulo = titulo_de_nota(nombre_archivo, cabecera)
+            self.lista_resultados.insert(tk.END, f"{marca[:10]} {titulo} — {seccion}")
+            self.resultados_busqueda.append((doc_id, None))
+        
+        if not self.resultados_busqueda:
+            self.lista_resultados.insert(tk.END, "Sin notas en ese rango")
+
+    def on_resultado_seleccionado(self, event=None):
+        """Abre la nota del resultado seleccionado en la línea donde aparece la búsqueda"""
+        seleccion = self.lista_resultados.curselection()
+        if not seleccion or seleccion[0] >= len(self.resultados_busqueda):
+            return
+        doc_id, linea = self.resultados_busqueda[seleccion[0]]
+        seccion, nombre_archivo = doc_id.split("/", 1)
+        
+        # Cambiar a la sección de la nota para que "Guardar" use la sección correcta
+        secciones = self.lista_secciones.get(0, tk.END)
+        if seccion in secciones:
+            index = secciones.index(seccion)
+            self.lista_secciones.selection_clear(0, tk.END)
+            self.lista_secciones.selection_set(index)
+            self.lista_secciones.activate(index)
+            self.lista_secciones.see(index)
+            self.on_seccion_seleccionada()
+        
+        self.cargar_nota(os.path.join("Registros", seccion, nombre_archivo))
+        if linea:
+            self.text_contenido.mark_set("insert", f"{linea}.0")
+            self.text_contenido.see(f"{linea}.0")
+            self.text_contenido.focus_set()
+    
+    def actualizar_indice_nota(self, ruta_nota):
+        """Actualiza la línea de tiempo y el índice de búsqueda tras guardar o eliminar una nota"""
+        doc_id = "/".join(partes_de_ruta(ruta_nota))
+        firma = firma_nota(ruta_nota)
+        if self.linea_tiempo.construida:
+            if firma is None:
+                self.linea_tiempo.quitar(doc_id)
+            else:
+                self.linea_tiempo.agregar(doc_id)
+        
+        def leer():
+            if firma is None:
+                return None
+            bloques, meta = leer_nota_para_indice(ruta_nota, doc_id)
+            return bloques, firma, meta
+        
+        self.indice_busqueda.reindexar(doc_id, leer)
+    
+    def al_ocultar(self):
+        """Guarda lo pendiente cuando la ventana se oculta (la aplicación sigue en memoria)"""
+        self.autoguardar_ahora()
+        self.indice_busqueda.programar_guardado()
+
+    def cleanup(self):
+        """Guarda los cambios pendientes y el índice de búsqueda al cerrar la ventana"""
+        self.autoguardar_ahora()
+        self.cancelar_carga()
+        self.indice_busqueda.programar_guardado()
+
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -3,13 +3,19 @@ from tkinter import ttk, scrolledtext, messagebox
 from datetime import date, datetime
 import os
 import json
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.pyplot as plt
-from matplotlib.dates import DateFormatter
+import queue
+import threading
 from assets.estilos.styles import Styles
 import calendar
-from tkcalendar import Calendar
 from assets.estilos.styles import ToolTip
+from modules.datos_gimnasio import IndiceEntrenamientos, BitacoraPeso, SerieEjercicio
+from modules.persistencia import cola_guardado
+from modules.almacen import Almacen
+from modules.instrumentacion import cronometrar, obtener_logger
+
+log = obtener_logger("gimnasio")
+
+INTERVALO_REVISION_CARGA = 50  # ms entre revisiones de la carga en segundo plano
 
 class GimnasioApp:
     def __init__(self, root):
@@ -69,6 +75,22 @@ class GimnasioApp:
         # Crear estructura de directorios
         self.inicializar_estructura()
         
+        # Índice de entrenamientos compartido por todas las vistas
+        self.indice = IndiceEntrenamientos.compartido(os.path.join("Registros", "Gimnasio"))
+        self.bitacora_peso = BitacoraPeso.compartida(os.path.join("Registros", "Peso"))
+        
+        # Las confirmaciones de guardado llegan por el bucle de eventos de esta ventana
+        cola_guardado.conectar(self.root)
+        
+        # El historial se lee en segundo plano para que la ventana responda desde el inicio
+        self.historial_listo = False
+        self.vista_pendiente = None
+        self.cola_carga = queue.Queue()
+        self.carga_en_curso = False
+        self.revision_carga = None  # after() que espera al hilo de carga
+        self.fig_ejercicio = self.fig_peso = None
+        self.iniciar_carga_historial()
+        
         # Crear menú principal
         self.crear_menu_principal()
         
@@ -157,8 +179,85 @@ class GimnasioApp:
 
 
 
+    def iniciar_carga_historial(self):
+        """Relee en segundo plano los entrenamientos y pesajes modificados (si no se está haciendo ya)"""
+        if self.carga_en_curso:
+            return
+        self.carga_en_curso = True
+        threading.Thread(target=self.cargar_historial_en_segundo_plano, daemon=True).start()
+        self.revision_carga = self.root.after(INTERVALO_REVISION_CARGA, self.revisar_carga_historial)
+
+    def cargar_historial_en_segundo_plano(self):
+        """Lee entrenamientos y pesajes fuera del hilo de Tk (el índice se actualiza al recibirlos)"""
+        try:
+            with cronometrar("gimnasio.cargar_historial"):
+                cambios = self.indice.leer_cambios()
+                pesajes = len(self.bitacora_peso.por_fecha)
+                self.bitacora_peso.cargar()
+                pesos_nuevos = len(self.bitacora_peso.por_fecha) != pesajes
+            self.cola_carga.put((cambios, pesos_nuevos, None))
+        except Exception as e:
+            self.cola_carga.put((None, False, e))
+
+    def revisar_carga_historial(self):
+        """Incorpora el historial cuando el hilo de carga termina y actualiza la vista abierta"""
+        self.revision_carga = None
+        try:
+            cambios, pesos_nuevos, error = self.cola_carga.get_nowait()
+        except queue.Empty:
+            if self.root.winfo_exists():
+                self.revision_carga = self.root.after(INTERVALO_REVISION_CARGA, self.revisar_carga_historial)
+            return
+        self.carga_en_curso = False
+        hubo_cambios = pesos_nuevos
+        if error is not None:
+            # Las vistas se muestran con lo que ya estuviera en el índice
+            log.error("No se pudo cargar el historial en segundo plano: %s", error)
+        else:
+            leidos, eliminados = cambios
+            hubo_cambios = hubo_cambios or bool(leidos or eliminados)
+            self.indice.aplicar_cambios(cambios)
+        self.historial_listo = True
+        if not self.root.winfo_exists():
+            return
+        if self.vista_pendiente is not None:
+            vista, self.vista_pendiente = self.vista_pendiente, None
+            vista()
+        elif hubo_cambios:
+            self.refrescar_vista_abierta()
+
+    def refrescar_vista_abierta(self):
+        """Vuelve a marcar el calendario o la lista de ejercicios si están a la vista"""
+        cal = getattr(self, 'cal', None)
+        if cal is not None and cal.winfo_exists():
+            cal.calevent_remove('all')
+            self.meses_resaltados = set()
+            self.resaltar_meses_visibles()
+        combo = getattr(self, 'ejercicio_combo', None)
+        if combo is not None and combo.winfo_exists():
+            combo.configure(values=self.obtener_lista_ejercicios())
+
+    def mostrar_cargando(self, vista):
+        """Muestra un aviso mientras se lee el historial; la vista se abre al terminar"""
+        if hasattr(self, 'main_content'):
+            self.main_content.destroy()
+
+        self.main_content = ttk.Frame(self.root, style="Custom.TFrame")
+        self.main_content.pack(expand=True, fill="both", padx=20, pady=(0, 20))
+
+        aviso_frame = ttk.Frame(self.main_content, style="Custom.TFrame")
+        aviso_frame.pack(expand=True)
+        ttk.Label(aviso_frame, text="⏳ Cargando historial...", style="Custom.TLabel").pack(pady=10)
+        barra = ttk.Progressbar(aviso_frame, mode="indeterminate", length=250,
+                                style="Custom.Horizontal.TProgressbar")
+        barra.pack()
+        barra.start(10)
+
+        self.vista_pendiente = vista
+
     def mostrar_registro_entrenamiento(self):
         """Muestra la interfaz para registrar entrenamientos"""
+        self.vista_pendiente = None
         # Limpiar el contenido principal si existe
         if hasattr(self, 'main_content'):
             self.main_content.destroy()
@@ -172,6 +271,9 @@ class GimnasioApp:
 
     def mostrar_historial(self):
         """Muestra el historial de entrenamientos en un calendario"""
+        if not self.historial_listo:
+            self.mostrar_cargando(self.mostrar_historial)
+            return
         # Limpiar el contenido principal si existe
         if hasattr(self, 'main_content'):
             self.main_content.destroy()
@@ -187,6 +289,7 @@ class GimnasioApp:
         cal_frame = ttk.LabelFrame(historial_frame, text="Calendario de Entrenamientos", style="Custom.TLabelframe")
         cal_frame.pack(side="left", fill="both", expand=True, padx=5, pady=5)
         
+        from tkcalendar import Calendar  # Solo se carga al abrir el historial
         self.cal = Calendar(
             cal_frame,
             selectmode="day",
@@ -222,6 +325,21 @@ class GimnasioApp:
         )
         self.detalle_text.pack(expand=True, fill="both")
 
+        # Selector de sesión para los días con más de un entrenamiento
+        sesion_frame = ttk.Frame(detalle_frame, style="Custom.TFrame")
+        sesion_frame.pack(fill="x", pady=(10, 0))
+
+        ttk.Label(sesion_frame, text="Sesión:", style="Custom.TLabel").pack(side="left", padx=5)
+        self.sesion_seleccionada = tk.StringVar()
+        self.combo_sesiones = ttk.Combobox(
+            sesion_frame,
+            textvariable=self.sesion_seleccionada,
+            state="readonly",
+            style="Custom.TCombobox",
+            width=40
+        )
+        self.combo_sesiones.pack(side="left", padx=5, fill="x", expand=True)
+
         # --- BOTÓN DE EDICIÓN (NUEVO) ---
         btn_editar = ttk.Button(
             detalle_frame,
@@ -232,32 +350,38 @@ class GimnasioApp:
         btn_editar.pack(pady=10, ipadx=10, ipady=5)
         
     def resaltar_dias_con_entrenamientos(self):
-        """Resalta los días que tienen entrenamientos o registros de peso"""
-        # Resaltar entrenamientos
-        entrenamientos = self.cargar_todos_entrenamientos()
-        for fecha_str in entrenamientos.keys():
-            try:
-                fecha = datetime.strptime(fecha_str.split('_')[0], "%Y-%m-%d").date()
-                self.cal.calevent_create(fecha, 'Entrenamiento', 'entrenamiento')
-            except:
-                continue
-            
-        self.cal.tag_config('entrenamiento', background=Styles.COLOR_ACCENT)
+        """Resalta los días con entrenamientos o registros de peso del mes visible y sus vecinos"""
+        # Se usa el índice ya cargado; los cambios en disco se leen en segundo plano
+        self.fechas_peso = self.bitacora_peso.por_fecha
 
-        # Resaltar registros de peso
-        ruta_gimnasio = os.path.join("Registros", "Peso")
-        if os.path.exists(ruta_gimnasio):
-            for archivo in os.listdir(ruta_gimnasio):
-                if archivo.startswith("peso_") and archivo.endswith(".json"):
-                    try:
-                        fecha_str = archivo[5:-5]  # Extrae la fecha de "peso_YYYY-MM-DD.json"
-                        fecha = datetime.strptime(fecha_str, "%Y-%m-%d").date()
-                        self.cal.calevent_create(fecha, 'Registro Peso', 'peso')
-                    except:
-                        continue
-                    
+        self.cal.tag_config('entrenamiento', background=Styles.COLOR_ACCENT)
         self.cal.tag_config('peso', background="#4CAF50")  # Verde para registros de peso
 
+        # Los eventos se crean por mes a medida que el usuario navega
+        self.meses_resaltados = set()
+        self.cal.bind("<<CalendarMonthChanged>>", self.resaltar_meses_visibles)
+        self.resaltar_meses_visibles()
+        self.iniciar_carga_historial()
+
+    def resaltar_meses_visibles(self, event=None):
+        """Crea los eventos del calendario para el mes mostrado y los meses contiguos"""
+        mes, anio = self.cal.get_displayed_month()
+        for desplazamiento in (-1, 0, 1):
+            anio_mes, indice_mes = divmod(anio * 12 + (mes - 1) + desplazamiento, 12)
+            clave_mes = (anio_mes, indice_mes + 1)
+            if clave_mes in self.meses_resaltados:
+                continue
+            self.meses_resaltados.add(clave_mes)
+
+            _, dias_mes = calendar.monthrange(*clave_mes)
+            for dia in range(1, dias_mes + 1):
+                fecha = date(clave_mes[0], clave_mes[1], dia)
+                fecha_str = fecha.isoformat()
+                if fecha_str in self.indice.por_fecha:
+                    self.cal.calevent_create(fecha, 'Entrenamiento', 'entrenamiento')
+                if fecha_str in self.fechas_peso:
+                    self.cal.calevent_create(fecha, 'Registro Peso', 'peso')
+
 
 
     def mostrar_detalle_entrenamiento(self, event=None):
@@ -268,19 +392,14 @@ class GimnasioApp:
         self.detalle_text.delete("1.0", tk.END)
 
         # Verificar si hay registro de peso para esta fecha
-        ruta_peso = os.path.join("Registros", "Peso", f"peso_{fecha_seleccionada}.json")
-        registro_peso = None
-        if os.path.exists(ruta_peso):
-            with open(ruta_peso, "r", encoding="utf-8") as f:
-                registro_peso = json.load(f)
-
-        # Buscar entrenamiento para la fecha seleccionada
-        entrenamientos = self.cargar_todos_entrenamientos()
-        entrenamiento = None
-        for fecha_str, datos in entrenamientos.items():
-            if fecha_str.startswith(fecha_seleccionada):
-                entrenamiento = datos
-                break
+        registro_peso = self.bitacora_peso.por_fecha.get(fecha_seleccionada)
+
+        # Sesiones de la fecha seleccionada (el índice ya se actualizó al abrir
+        # el historial)
+        sesiones = self.indice.sesiones(fecha_seleccionada)
+        nombres_sesiones = [nombre_base for nombre_base, _ in sesiones]
+        self.combo_sesiones["values"] = nombres_sesiones
+        self.sesion_seleccionada.set(nombres_sesiones[0] if nombres_sesiones else "")
             
         # Mostrar información del peso si existe
         if registro_peso:
@@ -291,9 +410,10 @@ class GimnasioApp:
             self.detalle_text.insert(tk.END, f"🏃 Actividad: {registro_peso['nivel_actividad']}\n")
             self.detalle_text.insert(tk.END, f"🎯 Objetivo: {registro_peso['objetivo']}\n\n", "section_end")
 
-        # Mostrar información del entrenamiento si existe
-        if entrenamiento:
-            self.detalle_text.insert(tk.END, "🏋️ ENTRENAMIENTO\n\n", "header")
+        # Mostrar información de cada entrenamiento del día
+        for numero, (_, entrenamiento) in enumerate(sesiones, start=1):
+            encabezado = "🏋️ ENTRENAMIENTO" if len(sesiones) == 1 else f"🏋️ ENTRENAMIENTO {numero}"
+            self.detalle_text.insert(tk.END, f"{encabezado}\n\n", "header")
             self.detalle_text.insert(tk.END, f"Tipo: {entrenamiento['tipo']}\n")
             self.detalle_text.insert(tk.END, f"Semana: {entrenamiento['semana']}\n\n")
 
@@ -307,8 +427,10 @@ class GimnasioApp:
                 self.detalle_text.insert(tk.END, "\nRecomendaciones:\n", "subheader")
                 self.detalle_text.insert(tk.END, entrenamiento['recomendaciones'])
 
+            self.detalle_text.insert(tk.END, "\n", "section_end")
+
         # Si no hay nada para mostrar
-        if not registro_peso and not entrenamiento:
+        if not registro_peso and not sesiones:
             self.detalle_text.insert(tk.END, f"No hay registros para {fecha_seleccionada}", "info")
 
         # Configurar formatos de texto
@@ -427,6 +549,9 @@ class GimnasioApp:
     
     def mostrar_grafica_avance(self):
         """Muestra gráficas de avance separadas para el ejercicio y el peso corporal."""
+        if not self.historial_listo:
+            self.mostrar_cargando(self.mostrar_grafica_avance)
+            return
         # Limpiar el contenido principal si existe
         if hasattr(self, 'main_content'):
             self.main_content.destroy()
@@ -444,7 +569,7 @@ class GimnasioApp:
         ejercicios = self.obtener_lista_ejercicios()
         self.ejercicio_grafica = tk.StringVar()
 
-        ejercicio_combo = ttk.Combobox(
+        self.ejercicio_combo = ejercicio_combo = ttk.Combobox(
             controles_frame,
             textvariable=self.ejercicio_grafica,
             values=ejercicios,
@@ -453,9 +578,11 @@ class GimnasioApp:
             width=30
         )
         ejercicio_combo.pack(side="left", padx=5)
+        ejercicio_combo.bind("<<ComboboxSelected>>", lambda e: self.actualizar_graficas())
 
         if ejercicios:
             self.ejercicio_grafica.set(ejercicios[0])
+        self.iniciar_carga_historial()
 
         ttk.Button(
             controles_frame,
@@ -471,8 +598,13 @@ class GimnasioApp:
         self.grafica_peso_frame = ttk.Frame(self.main_content, style="Custom.TFrame")
         self.grafica_peso_frame.pack(expand=True, fill="both", side="right", padx=10)
 
+        # matplotlib solo se carga al abrir las gráficas
+        import matplotlib.pyplot as plt
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
         # Configuración de estilo para gráficas oscuras
         plt.style.use('dark_background')
+        self.cerrar_graficas()  # Las de la visita anterior siguen registradas en pyplot
 
         # Inicializar gráficas con fondo oscuro pero contraste
         self.fig_ejercicio, self.ax_ejercicio = plt.subplots(figsize=(6, 4), facecolor='#2E2E2E')
@@ -497,7 +629,7 @@ class GimnasioApp:
         if not ejercicio:
             return
 
-        # Obtener datos del ejercicio
+        # Obtener la serie del ejercicio (ya ordenada por fecha)
         datos_ejercicio = self.obtener_datos_ejercicio(ejercicio)
         if not datos_ejercicio:
             messagebox.showinfo("Información", f"No hay datos históricos para {ejercicio}")
@@ -512,11 +644,9 @@ class GimnasioApp:
 
         # Actualizar gráfica del ejercicio
         self.ax_ejercicio.clear()
-        fechas_ejercicio = [datetime.strptime(d['fecha'], "%Y-%m-%d") for d in datos_ejercicio]
-        pesos_ejercicio = [float(d['peso']) for d in datos_ejercicio]
 
         # Configurar estilo de la gráfica
-        self.ax_ejercicio.plot(fechas_ejercicio, pesos_ejercicio, 'o-', color=Styles.COLOR_ACCENT_LIGHT, linewidth=2, markersize=8)
+        self.ax_ejercicio.plot(datos_ejercicio.fechas, datos_ejercicio.pesos, 'o-', color=Styles.COLOR_ACCENT_LIGHT, linewidth=2, markersize=8)
         self.ax_ejercicio.set_title(f"Peso levantado en {ejercicio}", color=Styles.COLOR_TEXT, pad=20)
         self.ax_ejercicio.set_xlabel("Fecha", color=axis_color)
         self.ax_ejercicio.set_ylabel("Peso (kg)", color=Styles.COLOR_ACCENT_LIGHT)
@@ -547,53 +677,17 @@ class GimnasioApp:
   
     def obtener_lista_ejercicios(self):
         """Obtiene una lista de todos los ejercicios registrados"""
-        entrenamientos = self.cargar_todos_entrenamientos()
-        ejercicios = set()
-        
-        for entrenamiento in entrenamientos.values():
-            for ejercicio in entrenamiento['ejercicios']:
-                ejercicios.add(ejercicio['ejercicio'])
-        
-        return sorted(ejercicios)
+        almacen = Almacen.activo()
+        if almacen:
+            return almacen.ejercicios()
+        return sorted(self.indice.ejercicios)
 
     def obtener_datos_ejercicio(self, ejercicio):
-        """Obtiene los datos históricos de un ejercicio específico"""
-        entrenamientos = self.cargar_todos_entrenamientos()
-        datos = []
-        
-        for fecha, entrenamiento in entrenamientos.items():
-            fecha_str = fecha.split('_')[0]
-            for ej in entrenamiento['ejercicios']:
-                if ej['ejercicio'] == ejercicio:
-                    datos.append({
-                        'fecha': fecha_str,
-                        'peso': ej['peso'],
-                        'repeticiones': ej['repeticiones'],
-                        'series': ej['series']
-                    })
-                    break
-        
-        # Ordenar por fecha
-        datos.sort(key=lambda x: datetime.strptime(x['fecha'], "%Y-%m-%d"))
-        return datos
-
-    def cargar_todos_entrenamientos(self):
-        """Carga todos los entrenamientos guardados"""
-        entrenamientos = {}
-        ruta_gimnasio = os.path.join("Registros", "Gimnasio")
-        
-        if os.path.exists(ruta_gimnasio):
-            for archivo in os.listdir(ruta_gimnasio):
-                if archivo.endswith(".json"):
-                    try:
-                        with open(os.path.join(ruta_gimnasio, archivo), "r", encoding="utf-8") as f:
-                            datos = json.load(f)
-                            nombre_base = os.path.splitext(archivo)[0]
-                            entrenamientos[nombre_base] = datos
-                    except:
-                        continue
-        
-        return entrenamientos
+        """Obtiene la serie histórica (fechas, pesos, repeticiones y series) de un ejercicio"""
+        almacen = Almacen.activo()
+        if almacen:
+            return SerieEjercicio.desde_filas(almacen.serie_ejercicio(ejercicio)) or None
+        return self.indice.series.get(ejercicio)
 
     def construir_interfaz_registro(self):
         """Construye la interfaz para registrar entrenamientos"""
@@ -983,14 +1077,17 @@ class GimnasioApp:
     def editar_entrenamiento_seleccionado(self):
         """Carga el entrenamiento seleccionado para su edición"""
         fecha_seleccionada = self.cal.get_date()
-        entrenamientos = self.cargar_todos_entrenamientos()
+        self.entrenamiento_actual = None
+        self.fecha_entrenamiento_actual = None
         
-        # Buscar el entrenamiento de la fecha seleccionada
-        for fecha_str, datos in entrenamientos.items():
-            if fecha_str.startswith(fecha_seleccionada):
-                self.entrenamiento_actual = datos
-                self.fecha_entrenamiento_actual = fecha_str.split('.')[0]  # Elimina .json si existe
-                break
+        # Usar la sesión elegida en el selector (la primera del día por defecto)
+        sesiones = dict(self.indice.sesiones(fecha_seleccionada))
+        nombre_base = self.sesion_seleccionada.get()
+        if nombre_base not in sesiones and sesiones:
+            nombre_base = next(iter(sesiones))
+        if nombre_base in sesiones:
+            self.entrenamiento_actual = sesiones[nombre_base]
+            self.fecha_entrenamiento_actual = nombre_base
         
         if not self.entrenamiento_actual:
             messagebox.showwarning("Advertencia", "No hay entrenamiento para editar en esta fecha.")
@@ -1104,23 +1201,32 @@ class GimnasioApp:
 
         ruta_completa = os.path.join("Registros", "Gimnasio", nombre_archivo)
 
-        try:
-            # Guardar como JSON
-            with open(ruta_completa, "w", encoding="utf-8") as f:
-                json.dump(entrenamiento, f, indent=2, ensure_ascii=False)
-
+        def al_terminar(error):
+            if error is not None:
+                Styles.show_msg_error(f"Error al guardar el entrenamiento:\n{str(error)}")
+                return
+            self.indice.registrar_archivo(ruta_completa)
             Styles.show_msg(f"Entrenamiento guardado exitosamente en:\n{ruta_completa}")
 
             # Limpiar campos
             self.limpiar_todo()
             self.semana_actual.set(semana + 1)
 
+        try:
+            almacen = Almacen.activo()
+            if almacen:
+                almacen.guardar_entrenamiento(os.path.splitext(nombre_archivo)[0], entrenamiento, al_terminar)
+            else:
+                # Guardar como JSON en segundo plano
+                contenido = json.dumps(entrenamiento, indent=2, ensure_ascii=False)
+                cola_guardado.guardar(ruta_completa, contenido, al_terminar)
         except Exception as e:
             Styles.show_msg_error(f"Error al guardar el entrenamiento:\n{str(e)}")
 
 
     def mostrar_control_peso(self):
         """Muestra la interfaz para el control de peso y calorías"""
+        self.vista_pendiente = None
         # Limpiar el contenido principal si existe
         if hasattr(self, 'main_content'):
             self.main_content.destroy()
@@ -1267,7 +1373,7 @@ class GimnasioApp:
             
 
     def guardar_registro_peso(self):
-        """Guarda el registro de peso en un archivo JSON"""
+        """Anexa el registro de peso a la bitácora de peso"""
         try:
             # Obtener la fecha actual si no hay una específica
             fecha = self.fecha_actual.get() or date.today().strftime("%Y-%m-%d")
@@ -1290,18 +1396,14 @@ class GimnasioApp:
                 "timestamp": datetime.now().isoformat()
             }
 
-            # Crear directorio si no existe
-            os.makedirs(os.path.join("Registros", "Peso"), exist_ok=True)
-
-            # Nombre del archivo
-            nombre_archivo = f"peso_{fecha}.json"
-            ruta_completa = os.path.join("Registros", "Peso", nombre_archivo)
+            def al_terminar(error):
+                if error is not None:
+                    Styles.show_msg_error(f"Error al guardar: {str(error)}")
+                else:
+                    Styles.show_msg(f"Registro de peso guardado en:\n{self.bitacora_peso.ruta_archivo}")
 
-            # Guardar como JSON
-            with open(ruta_completa, "w", encoding="utf-8") as f:
-                json.dump(registro, f, indent=2, ensure_ascii=False)
-
-            Styles.show_msg(f"Registro de peso guardado en:\n{ruta_completa}")
+            # Anexar a la bitácora (crea el directorio si no existe)
+            self.bitacora_peso.agregar(registro, al_terminar)
 
         except ValueError as e:
             Styles.show_msg_error(f"Datos inválidos: {str(e)}")
@@ -1323,26 +1425,34 @@ class GimnasioApp:
         except:
             return "No calculado"
         
+    def cerrar_graficas(self):
+        """Quita las figuras de las gráficas del registro global de pyplot"""
+        if self.fig_ejercicio is None and self.fig_peso is None:
+            return
+        import matplotlib.pyplot as plt
+        for figura in (self.fig_ejercicio, self.fig_peso):
+            if figura is not None:
+                plt.close(figura)
+        self.fig_ejercicio = self.fig_peso = None
+
+    def cleanup(self):
+        """Libera las gráficas y deja de esperar al hilo de carga al destruir la ventana"""
+        if self.revision_carga is not None:
+            self.root.after_cancel(self.revision_carga)
+            self.revision_carga = None
+        self.cerrar_graficas()
+
     def obtener_datos_peso(self):
-        """Obtiene los datos históricos de peso corporal"""
-        ruta_peso = os.path.join("Registros", "Peso")
+        """Obtiene los datos históricos de peso corporal ordenados por fecha"""
         datos_peso = []
-
-        if os.path.exists(ruta_peso):
-            for archivo in os.listdir(ruta_peso):
-                if archivo.startswith("peso_") and archivo.endswith(".json"):
-                    try:
-                        with open(os.path.join(ruta_peso, archivo), "r", encoding="utf-8") as f:
-                            registro = json.load(f)
-                            datos_peso.append({
-                                'fecha': registro['fecha'],
-                                'peso': registro['peso']
-                            })
-                    except:
-                        continue
-                    
-        # Ordenar por fecha
-        datos_peso.sort(key=lambda x: datetime.strptime(x['fecha'], "%Y-%m-%d"))
+        for registro in self.bitacora_peso.registros():
+            try:
+                datos_peso.append({
+                    'fecha': registro['fecha'],
+                    'peso': float(registro['peso'])
+                })
+            except (KeyError, TypeError, ValueError):
+                continue
         return datos_peso
     
     
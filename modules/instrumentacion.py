@@ -0,0 +1,75 @@
+import os
+import time
+import logging
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+RUTA_LOGS = os.path.join("Registros", ".logs")
+ARCHIVO_LOG = os.path.join(RUTA_LOGS, "aplicacion.log")
+TAMANO_MAXIMO_LOG = 512 * 1024  # bytes por archivo antes de rotar
+ARCHIVOS_DE_RESPALDO = 3
+
+# Nivel configurable sin tocar el código: APP_LOG_LEVEL=DEBUG
+NIVEL_POR_DEFECTO = os.environ.get("APP_LOG_LEVEL", "INFO").upper()
+
+_configurado = False
+
+
+def configurar_registro():
+    """Prepara el logger raíz de la aplicación con un archivo rotativo (una sola vez)"""
+    global _configurado
+    if _configurado:
+        return
+    _configurado = True
+
+    raiz = logging.getLogger("app")
+    raiz.setLevel(getattr(logging, NIVEL_POR_DEFECTO, logging.INFO))
+    raiz.propagate = False
+    try:
+        os.makedirs(RUTA_LOGS, exist_ok=True)
+        manejador = RotatingFileHandler(
+            ARCHIVO_LOG,
+            maxBytes=TAMANO_MAXIMO_LOG,
+            backupCount=ARCHIVOS_DE_RESPALDO,
+            encoding="utf-8",
+            delay=True
+        )
+    except OSError:
+        # Sin permisos de escritura: los mensajes van a la consola
+        manejador = logging.StreamHandler()
+    manejador.setFormatter(logging.Formatter(
+        "%(asctime)s %(levelname)-7s %(name)s: %(message)s"
+    ))
+    raiz.addHandler(manejador)
+
+
+def obtener_logger(nombre):
+    """Devuelve el logger de un módulo de la aplicación ("diario" -> app.diario)"""
+    configurar_registro()
+    return logging.getLogger(f"app.{nombre}")
+
+
+_tiempos = obtener_logger("tiempos")
+
+
+@contextmanager
+def cronometrar(operacion):
+    """Registra cuánto tarda un bloque de código o una función
+
+    Se usa como `with cronometrar("diario.cargar_nota"):` o como decorador
+    `@cronometrar("diario.cargar_nota")`. Las duraciones van al log de tiempos
+    y las operaciones que terminan con una excepción se marcan como error.
+    """
+    inicio = time.perf_counter()
+    fallo = False
+    try:
+        yield
+    except BaseException:
+        fallo = True
+        raise
+    finally:
+        milisegundos = (time.perf_counter() - inicio) * 1000
+        if fallo:
+            _tiempos.warning("%s %.1f ms (error)", operacion, milisegundos)
+        else:
+            _tiempos.info("%s %.1f ms", operacion, milisegundos)
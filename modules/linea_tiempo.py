@@ -0,0 +1,75 @@
+from bisect import bisect_left, insort
+from datetime import datetime
+
+
+def marca_de_archivo(nombre_archivo):
+    """Convierte "YYYY-MM-DD_HH-MM-SS_titulo.txt" en "YYYY-MM-DD HH:MM:SS" (None si no sigue el formato)"""
+    partes = nombre_archivo.split('_', 2)
+    if len(partes) < 3:
+        return None
+    try:
+        datetime.strptime(f"{partes[0]}_{partes[1]}", "%Y-%m-%d_%H-%M-%S")
+    except ValueError:
+        return None
+    return f"{partes[0]} {partes[1].replace('-', ':')}"
+
+
+class LineaDeTiempo:
+    """Notas de todas las secciones ordenadas por el momento en que se crearon.
+
+    Las claves (marca, doc_id) se guardan en una lista ordenada: un rango de
+    fechas se resuelve con dos búsquedas binarias, sin recorrer las secciones.
+    Las marcas "YYYY-MM-DD HH:MM:SS" se ordenan igual como texto que como fecha.
+    """
+
+    _compartida = None
+
+    def __init__(self):
+        self.claves = []      # (marca, doc_id) ordenadas
+        self._marcas = {}     # doc_id -> marca
+        self.construida = False
+
+    @classmethod
+    def compartida(cls):
+        """Devuelve la línea de tiempo del proceso (se construye al primer uso)"""
+        if cls._compartida is None:
+            cls._compartida = cls()
+        return cls._compartida
+
+    def construir(self, doc_ids):
+        """Crea la línea de tiempo a partir de los doc_id "seccion/archivo" existentes"""
+        self._marcas = {}
+        for doc_id in doc_ids:
+            marca = marca_de_archivo(doc_id.split("/", 1)[-1])
+            if marca is not None:
+                self._marcas[doc_id] = marca
+        self.claves = sorted((marca, doc_id) for doc_id, marca in self._marcas.items())
+        self.construida = True
+
+    def agregar(self, doc_id):
+        """Añade una nota nueva en su posición"""
+        if doc_id in self._marcas:
+            return
+        marca = marca_de_archivo(doc_id.split("/", 1)[-1])
+        if marca is None:
+            return
+        self._marcas[doc_id] = marca
+        insort(self.claves, (marca, doc_id))
+
+    def quitar(self, doc_id):
+        """Elimina una nota de la línea de tiempo"""
+        marca = self._marcas.pop(doc_id, None)
+        if marca is None:
+            return
+        i = bisect_left(self.claves, (marca, doc_id))
+        if i < len(self.claves) and self.claves[i] == (marca, doc_id):
+            del self.claves[i]
+
+    def entre(self, desde, hasta):
+        """Devuelve (marca, doc_id) con desde <= marca < hasta, de la más reciente a la más antigua
+
+        Los límites pueden ser fechas "YYYY-MM-DD" o marcas completas.
+        """
+        inicio = bisect_left(self.claves, (desde,))
+        fin = bisect_left(self.claves, (hasta,))
+        return self.claves[inicio:fin][::-1]
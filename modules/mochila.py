@@ -2,10 +2,117 @@ import tkinter as tk
 from tkinter import ttk, scrolledtext, filedialog, messagebox
 import os
 import json
-import pdfkit
+from html import escape
 from datetime import datetime
 from assets.estilos.styles import Styles
 from assets.estilos.styles import ToolTip
+from assets.estilos.lista_virtual import ListaVirtual
+from modules.busqueda import IndiceInvertido, mostrar_resultados
+from modules.persistencia import cola_guardado
+from modules.instrumentacion import obtener_logger, cronometrar
+from modules.almacen import Almacen
+
+log = obtener_logger("mochila")
+
+BACKPACK_PATH = os.path.join("Registros", "Mochila")
+SEARCH_INDEX_PATH = os.path.join("Registros", ".cache", "indice_mochila.json")
+
+# Peso de cada tipo de bloque en la búsqueda: los títulos pesan más
+BLOCK_WEIGHTS = {'heading1': 4.0, 'heading2': 2.5, 'bold': 1.5, 'normal': 1.0}
+
+
+def class_path(subject, class_name):
+    return os.path.join(BACKPACK_PATH, subject, f"{class_name}.json")
+
+
+def list_subjects():
+    """Lista las materias (carpetas de la mochila o tabla del almacén)"""
+    store = Almacen.activo()
+    if store:
+        return store.materias()
+    if not os.path.exists(BACKPACK_PATH):
+        return []
+    return [subject for subject in sorted(os.listdir(BACKPACK_PATH))
+            if os.path.isdir(os.path.join(BACKPACK_PATH, subject))]
+
+
+def list_classes(subject):
+    """Lista los apuntes de una materia sin la extensión .json"""
+    store = Almacen.activo()
+    if store:
+        return store.clases(subject)
+    subject_path = os.path.join(BACKPACK_PATH, subject)
+    if not os.path.exists(subject_path):
+        return []
+    return [file[:-5] for file in sorted(os.listdir(subject_path))  # Quitar la extensión .json
+            if file.endswith(".json")]
+
+
+def read_class(subject, class_name):
+    """Devuelve los bloques de un apunte, o None si no existe"""
+    store = Almacen.activo()
+    if store:
+        stored = store.clase(subject, class_name)
+        return stored[0] if stored else None
+    path = class_path(subject, class_name)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def class_signature(subject, class_name):
+    """Devuelve la firma (modificación, tamaño) de un apunte, o None si no existe"""
+    store = Almacen.activo()
+    if store:
+        return store.firma_clase(subject, class_name)
+    try:
+        stat = os.stat(class_path(subject, class_name))
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def list_class_files():
+    """Lista los apuntes de todas las materias como doc_id -> (ruta, firma)"""
+    files = {}
+    store = Almacen.activo()
+    if store:
+        for doc_id, signature in store.firmas_clases().items():
+            files[doc_id] = (class_path(*doc_id.split("/", 1)), signature)
+        return files
+    if not os.path.isdir(BACKPACK_PATH):
+        return files
+    with os.scandir(BACKPACK_PATH) as subjects:
+        for subject in subjects:
+            if not subject.is_dir():
+                continue
+            with os.scandir(subject.path) as classes:
+                for class_file in classes:
+                    if not class_file.name.endswith(".json") or not class_file.is_file():
+                        continue
+                    stat = class_file.stat()
+                    doc_id = f"{subject.name}/{class_file.name[:-5]}"
+                    files[doc_id] = (class_file.path, (stat.st_mtime_ns, stat.st_size))
+    return files
+
+
+def class_blocks(doc_id, content):
+    """Convierte los bloques de un apunte en (texto, peso, línea) para el índice"""
+    subject, class_name = doc_id.split("/", 1)
+    # Cada bloque ocupa una línea del editor al cargarlo
+    blocks = [(class_name, BLOCK_WEIGHTS['heading1'], 1)]
+    for line, item in enumerate(content, start=1):
+        blocks.append((item.get('text', ''), BLOCK_WEIGHTS.get(item.get('type'), 1.0), line))
+    return blocks, {"subject": subject, "class": class_name}
+
+
+def read_class_for_index(path, doc_id):
+    """Lee un apunte y lo prepara para el índice de búsqueda"""
+    content = read_class(*doc_id.split("/", 1))
+    if not isinstance(content, list):
+        raise ValueError("Formato de apunte no válido")
+    return class_blocks(doc_id, content)
 
 class RichTextEditor(scrolledtext.ScrolledText):
     """Editor de texto enriquecido con capacidades básicas de formato"""
@@ -107,60 +214,104 @@ class RichTextEditor(scrolledtext.ScrolledText):
         except tk.TclError:
             pass  # No hay texto seleccionado o error en índices
 
+    @staticmethod
+    def _line_type(tags):
+        """Devuelve el formato de una línea según los tags activos en su inicio"""
+        if 'heading1' in tags:
+            return 'heading1'
+        elif 'heading2' in tags:
+            return 'heading2'
+        elif 'bold' in tags:
+            return 'bold'
+        return 'normal'
+
+    def _iter_formatted_lines(self):
+        """Recorre el contenido en una sola pasada y devuelve (tipo, texto) por línea
+
+        Usa el volcado del widget (texto y cambios de tags en orden), así cada
+        línea toma el formato que tiene en su propia posición aunque otra línea
+        tenga el mismo texto.
+        """
+        active_tags = set()
+        line_type = None
+        pieces = []
+        for key, value, _ in self.dump("1.0", "end-1c", text=True, tag=True):
+            if key == 'tagon':
+                active_tags.add(value)
+            elif key == 'tagoff':
+                active_tags.discard(value)
+            elif key == 'text':
+                parts = value.split('\n')
+                for part in parts[:-1]:
+                    if line_type is None:
+                        line_type = self._line_type(active_tags)
+                    pieces.append(part)
+                    yield line_type, ''.join(pieces)
+                    line_type = None
+                    pieces = []
+                if parts[-1]:
+                    if line_type is None:
+                        line_type = self._line_type(active_tags)
+                    pieces.append(parts[-1])
+        if pieces:
+            yield line_type, ''.join(pieces)
+
     def get_json_content(self):
         """Convierte el contenido a formato JSON para guardar"""
-        content = []
-        for line in self.get("1.0", tk.END).split('\n'):
-            if not line.strip():
-                continue
-                
-            # Obtener tags de la primera posición de la línea
-            line_start = self.search(line, "1.0", stopindex=tk.END)
-            if line_start:
-                tags = self.tag_names(line_start)
-                line_type = 'normal'
-                
-                if 'heading1' in tags:
-                    line_type = 'heading1'
-                elif 'heading2' in tags:
-                    line_type = 'heading2'
-                elif 'bold' in tags:
-                    line_type = 'bold'
-                
-                content.append({
-                    'type': line_type,
-                    'text': line
-                })
-        
-        return content
+        return [
+            {'type': line_type, 'text': line}
+            for line_type, line in self._iter_formatted_lines()
+            if line.strip()
+        ]
 
     def load_json_content(self, content_data):
-        """Carga contenido desde formato JSON"""
-        self.delete("1.0", tk.END)
+        """Carga contenido desde formato JSON
+
+        Inserta todo el texto de una vez y aplica cada formato con un solo
+        tag_add por tipo (agrupando líneas consecutivas). Al terminar vacía la
+        pila de deshacer para que Ctrl+Z no borre el apunte recién abierto.
+        """
+        lines = []
+        ranges = {}  # tipo -> [inicio, fin, inicio, fin, ...]
+        previous_type = None
+        start = 1
         for item in content_data:
-            self.insert("end", item['text'] + '\n', item['type'])
+            line_type = item.get('type', 'normal')
+            lines.append(item['text'])
+            end = start + item['text'].count('\n') + 1
+            tag_ranges = ranges.setdefault(line_type, [])
+            if line_type == previous_type:
+                tag_ranges[-1] = f"{end}.0"  # Extender el rango anterior
+            else:
+                tag_ranges.extend((f"{start}.0", f"{end}.0"))
+            previous_type = line_type
+            start = end
+
+        self.delete("1.0", tk.END)
+        if lines:
+            self.insert("1.0", '\n'.join(lines) + '\n')
+            for line_type, tag_ranges in ranges.items():
+                self.tag_add(line_type, *tag_ranges)
+
+        self.edit_reset()
+        self.edit_modified(False)
+
+    HTML_TEMPLATES = {
+        'heading1': "<h1>{}</h1>",
+        'heading2': "<h2>{}</h2>",
+        'bold': "<p><strong>{}</strong></p>",
+        'normal': "<p>{}</p>",
+    }
+
+    def iter_html_lines(self):
+        """Genera las líneas HTML (con el texto escapado) en una sola pasada"""
+        for line_type, line in self._iter_formatted_lines():
+            if line.strip():
+                yield self.HTML_TEMPLATES[line_type].format(escape(line))
 
     def get_html_content(self):
         """Genera HTML para exportación a PDF"""
-        html_lines = []
-        for line in self.get("1.0", tk.END).split('\n'):
-            if not line.strip():
-                continue
-                
-            line_start = self.search(line, "1.0", stopindex=tk.END)
-            if line_start:
-                tags = self.tag_names(line_start)
-                
-                if 'heading1' in tags:
-                    html_lines.append(f"<h1>{line}</h1>")
-                elif 'heading2' in tags:
-                    html_lines.append(f"<h2>{line}</h2>")
-                elif 'bold' in tags:
-                    html_lines.append(f"<p><strong>{line}</strong></p>")
-                else:
-                    html_lines.append(f"<p>{line}</p>")
-        
-        return '\n'.join(html_lines)
+        return '\n'.join(self.iter_html_lines())
 
 
 class MochilaApp:
@@ -184,6 +335,10 @@ class MochilaApp:
         self.current_class = tk.StringVar(value=f"CLASE {datetime.now().strftime('%d-%m')}")
         self.selected_subject = None
         self.selected_class = None
+        self.search_query = tk.StringVar()
+        self.search_results = []  # (doc_id, línea) por fila de la lista de resultados
+        self.search_index = IndiceInvertido.compartido(SEARCH_INDEX_PATH)
+        cola_guardado.conectar(self.root)
 
     def _initialize_structure(self):
         """Crea la estructura inicial de directorios"""
@@ -203,6 +358,9 @@ class MochilaApp:
         right_panel = ttk.Frame(main_frame, style="Custom.TFrame")
         right_panel.pack(side="right", expand=True, fill="both", padx=5)
         
+        # Búsqueda en todos los apuntes
+        self._build_search_section(left_panel)
+        
         # Sección de materias
         self._build_subjects_section(left_panel)
         
@@ -215,6 +373,29 @@ class MochilaApp:
         # Botón de guardar en la parte inferior
         self._build_bottom_controls(right_panel)
 
+    def _build_search_section(self, parent):
+        """Construye la sección de búsqueda en todos los apuntes"""
+        frame = ttk.LabelFrame(parent, text="Buscar", style="Custom.TLabelframe")
+        frame.pack(fill="x", pady=5)
+        
+        search_entry = ttk.Entry(frame, textvariable=self.search_query, style="Custom.TEntry")
+        search_entry.pack(fill="x", padx=5, pady=5)
+        search_entry.bind('<Return>', lambda e: self._search_notes())
+        
+        self.results_list = tk.Listbox(
+            frame,
+            bg=Styles.COLOR_BACKGROUND,
+            fg=Styles.COLOR_TEXT,
+            selectbackground=Styles.COLOR_PRIMARY,
+            font=Styles.FONT,
+            borderwidth=0,
+            highlightthickness=0,
+            selectmode=tk.SINGLE,
+            height=5
+        )
+        self.results_list.pack(fill="x")
+        self.results_list.bind("<<ListboxSelect>>", self._on_result_selected)
+
     def _build_subjects_section(self, parent):
         """Construye la sección de materias"""
         frame = ttk.LabelFrame(parent, text="Materias", style="Custom.TLabelframe")
@@ -286,15 +467,12 @@ class MochilaApp:
             command=self._delete_subject
         ).pack(side="right", expand=True)
         
-        self.subjects_list = tk.Listbox(
+        self.subjects_list = ListaVirtual(
             parent,
             bg=Styles.COLOR_BACKGROUND,
             fg=Styles.COLOR_TEXT,
             selectbackground=Styles.COLOR_PRIMARY,
-            font=Styles.FONT,
-            borderwidth=0,
-            highlightthickness=0,
-            selectmode=tk.SINGLE
+            font=Styles.FONT
         )
         self.subjects_list.pack(expand=True, fill="both", pady=5)
         self.subjects_list.bind("<<ListboxSelect>>", self._on_subject_selected)
@@ -321,15 +499,12 @@ class MochilaApp:
             command=self._delete_class
         ).pack(side="right", expand=True)
         
-        self.classes_list = tk.Listbox(
+        self.classes_list = ListaVirtual(
             parent,
             bg=Styles.COLOR_BACKGROUND,
             fg=Styles.COLOR_TEXT,
             selectbackground=Styles.COLOR_PRIMARY,
-            font=Styles.FONT,
-            borderwidth=0,
-            highlightthickness=0,
-            selectmode=tk.SINGLE
+            font=Styles.FONT
         )
         self.classes_list.pack(expand=True, fill="both", pady=5)
         self.classes_list.bind("<<ListboxSelect>>", self._on_class_selected)
@@ -384,13 +559,7 @@ class MochilaApp:
 
     def _update_subjects_list(self):
         """Actualiza la lista de materias disponibles"""
-        self.subjects_list.delete(0, tk.END)
-        backpack_path = os.path.join("Registros", "Mochila")
-        
-        if os.path.exists(backpack_path):
-            for subject in sorted(os.listdir(backpack_path)):
-                if os.path.isdir(os.path.join(backpack_path, subject)):
-                    self.subjects_list.insert(tk.END, subject)
+        self.subjects_list.set_items(list_subjects())
         
         # Seleccionar la primera materia si existe
         if self.subjects_list.size() > 0:
@@ -407,7 +576,11 @@ class MochilaApp:
         
         subject_path = os.path.join("Registros", "Mochila", subject)
         try:
-            os.makedirs(subject_path, exist_ok=True)
+            store = Almacen.activo()
+            if store:
+                store.crear_materia(subject)
+            else:
+                os.makedirs(subject_path, exist_ok=True)
             self._update_subjects_list()
             self.current_subject.set("")
             
@@ -433,13 +606,19 @@ class MochilaApp:
             f"¿Estás seguro de eliminar la materia '{self.selected_subject}' y todos sus apuntes?"
         ):
             try:
-                subject_path = os.path.join("Registros", "Mochila", self.selected_subject)
-                for root, dirs, files in os.walk(subject_path, topdown=False):
-                    for name in files:
-                        os.remove(os.path.join(root, name))
-                    for name in dirs:
-                        os.rmdir(os.path.join(root, name))
-                os.rmdir(subject_path)
+                store = Almacen.activo()
+                if store:
+                    store.eliminar_materia(self.selected_subject)
+                else:
+                    subject_path = os.path.join("Registros", "Mochila", self.selected_subject)
+                    cola_guardado.cancelar(subject_path)
+                    for root, dirs, files in os.walk(subject_path, topdown=False):
+                        for name in files:
+                            os.remove(os.path.join(root, name))
+                        for name in dirs:
+                            os.rmdir(os.path.join(root, name))
+                    os.rmdir(subject_path)
+                self._remove_subject_from_index(self.selected_subject)
                 
                 self._update_subjects_list()
                 self.classes_list.delete(0, tk.END)
@@ -455,13 +634,7 @@ class MochilaApp:
         if not self.selected_subject:
             return
             
-        self.classes_list.delete(0, tk.END)
-        subject_path = os.path.join("Registros", "Mochila", self.selected_subject)
-        
-        if os.path.exists(subject_path):
-            for file in sorted(os.listdir(subject_path)):
-                if file.endswith(".json"):
-                    self.classes_list.insert(tk.END, file[:-5])  # Quitar la extensión .json
+        self.classes_list.set_items(list_classes(self.selected_subject))
         
         # Seleccionar la primera clase si existe
         if self.classes_list.size() > 0:
@@ -482,15 +655,23 @@ class MochilaApp:
             
         note_path = os.path.join("Registros", "Mochila", self.selected_subject, f"{class_name}.json")
         
-        if os.path.exists(note_path) and not messagebox.askyesno(
+        if class_signature(self.selected_subject, class_name) is not None and not messagebox.askyesno(
             "Confirmar",
             f"El apunte '{class_name}' ya existe. ¿Deseas sobrescribirlo?"
         ):
             return
         
         try:
-            with open(note_path, "w", encoding="utf-8") as f:
-                json.dump([{"type": "heading1", "text": class_name}], f, indent=2)
+            content = [{"type": "heading1", "text": class_name}]
+            store = Almacen.activo()
+            if store:
+                store.crear_clase(self.selected_subject, class_name, content)
+            else:
+                # Un guardado pendiente del apunte anterior no debe pisar el recién creado
+                cola_guardado.cancelar(note_path)
+                with open(note_path, "w", encoding="utf-8") as f:
+                    json.dump(content, f, indent=2)
+            self._index_class(self.selected_subject, class_name, content, note_path)
             
             self._load_classes()
             
@@ -520,7 +701,13 @@ class MochilaApp:
         ):
             try:
                 note_path = os.path.join("Registros", "Mochila", self.selected_subject, f"{self.selected_class}.json")
-                os.remove(note_path)
+                store = Almacen.activo()
+                if store:
+                    store.eliminar_clase(self.selected_subject, self.selected_class)
+                else:
+                    cola_guardado.cancelar(note_path)
+                    os.remove(note_path)
+                self._index_class(self.selected_subject, self.selected_class, None, note_path)
                 
                 self._load_classes()
                 self.editor.delete("1.0", tk.END)
@@ -529,6 +716,7 @@ class MochilaApp:
             except Exception as e:
                 messagebox.showerror("Error", f"No se pudo eliminar el apunte:\n{str(e)}")
 
+    @cronometrar("mochila._load_note")
     def _load_note(self):
         """Carga el apunte seleccionado"""
         if not self.selected_subject or not self.selected_class:
@@ -537,31 +725,42 @@ class MochilaApp:
         note_path = os.path.join("Registros", "Mochila", self.selected_subject, f"{self.selected_class}.json")
         
         try:
-            if os.path.exists(note_path):
-                with open(note_path, "r", encoding="utf-8") as f:
-                    content = json.load(f)
+            content = read_class(self.selected_subject, self.selected_class)
+            if content is not None:
                 self.editor.load_json_content(content)
             else:
                 # Si no existe, crear un apunte nuevo con un título
-                self.editor.delete("1.0", tk.END)
-                self.editor.insert("end", f"{self.selected_class}\n", "heading1")
+                self.editor.load_json_content([{"type": "heading1", "text": self.selected_class}])
         except Exception as e:
+            log.exception("No se pudo cargar el apunte %s", note_path)
             messagebox.showerror("Error", f"No se pudo cargar el apunte:\n{str(e)}")
 
-    def _save_note(self):
-        """Guarda el apunte actual"""
+    def _save_note(self, quiet=False):
+        """Guarda el apunte actual (quiet: sin avisos salvo errores, al ocultar la ventana)"""
         if not self.selected_subject or not self.selected_class:
-            messagebox.showwarning("Advertencia", "Selecciona una materia y una clase primero")
+            if not quiet:
+                messagebox.showwarning("Advertencia", "Selecciona una materia y una clase primero")
             return
             
-        note_path = os.path.join("Registros", "Mochila", self.selected_subject, f"{self.selected_class}.json")
+        subject, class_name = self.selected_subject, self.selected_class
+        note_path = os.path.join("Registros", "Mochila", subject, f"{class_name}.json")
         content = self.editor.get_json_content()
         
+        def on_saved(error):
+            if error is not None:
+                messagebox.showerror("Error", f"No se pudo guardar el apunte:\n{str(error)}")
+                return
+            self._index_class(subject, class_name, content, note_path)
+            if not quiet:
+                messagebox.showinfo("Guardado", f"Apunte '{class_name}' guardado correctamente")
+        
         try:
-            with open(note_path, "w", encoding="utf-8") as f:
-                json.dump(content, f, indent=2, ensure_ascii=False)
-            
-            messagebox.showinfo("Guardado", f"Apunte '{self.selected_class}' guardado correctamente")
+            store = Almacen.activo()
+            if store:
+                store.guardar_clase(subject, class_name, content, on_saved)
+            else:
+                cola_guardado.guardar(note_path, json.dumps(content, indent=2, ensure_ascii=False), on_saved)
+            self.editor.edit_modified(False)
         except Exception as e:
             messagebox.showerror("Error", f"No se pudo guardar el apunte:\n{str(e)}")
 
@@ -579,7 +778,7 @@ class MochilaApp:
             <html>
             <head>
                 <meta charset="utf-8">
-                <title>{self.selected_class} - {self.selected_subject}</title>
+                <title>{escape(self.selected_class)} - {escape(self.selected_subject)}</title>
                 <style>
                     body {{ font-family: Arial, sans-serif; line-height: 1.6; margin: 2cm; }}
                     h1 {{ color: #2c3e50; border-bottom: 2px solid #2c3e50; padding-bottom: 5px; }}
@@ -589,8 +788,8 @@ class MochilaApp:
                 </style>
             </head>
             <body>
-                <h1>{self.selected_class}</h1>
-                <h2>{self.selected_subject}</h2>
+                <h1>{escape(self.selected_class)}</h1>
+                <h2>{escape(self.selected_subject)}</h2>
                 {html}
                 <footer style="margin-top: 20px; font-size: 0.8em; text-align: right;">
                     Generado con Mochila Universitaria - {datetime.now().strftime('%d/%m/%Y %H:%M')}
@@ -606,6 +805,7 @@ class MochilaApp:
             )
             
             if pdf_path:
+                import pdfkit  # Solo se carga al exportar
                 pdfkit.from_string(styled_html, pdf_path)
                 messagebox.showinfo("Éxito", f"PDF exportado correctamente a:\n{pdf_path}")
                 
@@ -616,6 +816,70 @@ class MochilaApp:
         """Método público para guardar notas (usado por el editor)"""
         self._save_note()
 
+    def _search_notes(self):
+        """Busca la consulta en los apuntes de todas las materias"""
+        self.search_results = mostrar_resultados(
+            self.results_list, self.search_index,
+            self.search_query.get().strip(),
+            list_class_files, read_class_for_index,
+            lambda meta: f"{meta['class']} — {meta['subject']}"
+        )
+
+    def _on_result_selected(self, event=None):
+        """Abre el apunte del resultado seleccionado en la línea encontrada"""
+        selection = self.results_list.curselection()
+        if not selection or selection[0] >= len(self.search_results):
+            return
+        doc_id, line = self.search_results[selection[0]]
+        subject, class_name = doc_id.split("/", 1)
+        
+        # Seleccionar la materia y luego la clase en sus listas
+        for listbox, value, handler in (
+            (self.subjects_list, subject, self._on_subject_selected),
+            (self.classes_list, class_name, self._on_class_selected)
+        ):
+            items = listbox.get(0, tk.END)
+            if value not in items:
+                return
+            index = items.index(value)
+            listbox.selection_clear(0, tk.END)
+            listbox.selection_set(index)
+            listbox.activate(index)
+            listbox.see(index)
+            handler()
+        
+        if line:
+            self.editor.mark_set("insert", f"{line}.0")
+            self.editor.see(f"{line}.0")
+            self.editor.focus_set()
+
+    def _index_class(self, subject, class_name, content, note_path):
+        """Actualiza el índice tras crear, guardar (content) o eliminar (None) un apunte"""
+        doc_id = f"{subject}/{class_name}"
+
+        def read():
+            signature = class_signature(subject, class_name) if content is not None else None
+            if signature is None:
+                return None
+            blocks, meta = class_blocks(doc_id, content)
+            return blocks, signature, meta
+
+        self.search_index.reindexar(doc_id, read)
+
+    def _remove_subject_from_index(self, subject):
+        """Quita del índice todos los apuntes de una materia eliminada"""
+        self.search_index.quitar_prefijo(f"{subject}/")
+
+    def al_ocultar(self):
+        """Guarda el apunte abierto y el índice cuando la ventana se oculta (la aplicación sigue en memoria)"""
+        if self.editor.edit_modified():
+            self._save_note(quiet=True)
+        self.search_index.programar_guardado()
+
+    def cleanup(self):
+        """Guarda el índice de búsqueda al cerrar la ventana"""
+        self.search_index.programar_guardado()
+
 
 def main():
     root = tk.Tk()
@@ -0,0 +1,199 @@
+import os
+import atexit
+import queue
+import tempfile
+import threading
+from collections import OrderedDict
+from modules.instrumentacion import obtener_logger, cronometrar
+
+log = obtener_logger("persistencia")
+
+
+def escribir_atomico(ruta, datos):
+    """Escribe bytes en un temporal del mismo directorio y lo reemplaza de forma atómica
+
+    Si el proceso se interrumpe a mitad de la escritura, el archivo original
+    queda intacto.
+    """
+    directorio = os.path.dirname(ruta) or "."
+    os.makedirs(directorio, exist_ok=True)
+    fd, temporal = tempfile.mkstemp(dir=directorio, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(datos)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, ruta)
+    except BaseException:
+        try:
+            os.remove(temporal)
+        except OSError:
+            pass
+        raise
+
+
+def anexar_sincronizado(ruta, datos):
+    """Añade bytes al final de un archivo y espera a que lleguen al disco"""
+    directorio = os.path.dirname(ruta)
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    with open(ruta, "ab") as f:
+        f.write(datos)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class ColaGuardado:
+    """Escrituras en segundo plano para no bloquear la interfaz.
+
+    Los guardados repetidos de una misma ruta que aún no empezaron a escribirse
+    se agrupan en una sola escritura (gana el último contenido; los anexados se
+    concatenan). Cuando termina una escritura, su callback `al_terminar(error)`
+    se ejecuta en el hilo de Tk, consultando la cola de resultados con `after`.
+    """
+
+    INTERVALO_SONDEO = 50  # ms
+
+    def __init__(self):
+        self._pendientes = OrderedDict()  # (ruta, modo) -> [bytes, [callbacks]]
+        self._condicion = threading.Condition()
+        self._en_curso = 0
+        self._escribiendo = None  # ruta que el hilo está escribiendo ahora
+        self._completados = queue.Queue()  # (callbacks, error)
+        self._hilo = None
+        self._raiz = None
+        self._sondeo = None
+
+    def conectar(self, widget):
+        """Indica la ventana de Tk donde se ejecutarán los callbacks"""
+        raiz = widget._root()
+        if self._raiz is not raiz:
+            self._raiz = raiz
+            self._sondeo = None
+
+    def guardar(self, ruta, contenido, al_terminar=None):
+        """Programa el reemplazo completo de un archivo (str en UTF-8 o bytes)"""
+        self._encolar(ruta, "reemplazar", contenido, al_terminar)
+
+    def anexar(self, ruta, contenido, al_terminar=None):
+        """Programa la escritura de contenido al final de un archivo"""
+        self._encolar(ruta, "anexar", contenido, al_terminar)
+
+    def ejecutar(self, ruta, escritura, al_terminar=None):
+        """Programa una escritura que no es un archivo (p. ej. en la base de datos)
+
+        `ruta` identifica el registro escrito: las escrituras pendientes con la
+        misma ruta se agrupan (gana la última) y cancelar(ruta) las descarta.
+        """
+        self._encolar(ruta, "ejecutar", escritura, al_terminar)
+
+    def _encolar(self, ruta, modo, contenido, al_terminar):
+        datos = contenido.encode("utf-8") if isinstance(contenido, str) else contenido
+        clave = (os.path.abspath(ruta), modo)
+        with self._condicion:
+            if clave in self._pendientes:
+                pendiente = self._pendientes[clave]
+                pendiente[0] = pendiente[0] + datos if modo == "anexar" else datos
+            else:
+                pendiente = self._pendientes[clave] = [datos, []]
+            if al_terminar is not None:
+                pendiente[1].append(al_terminar)
+            self._iniciar_hilo()
+            self._condicion.notify()
+        self._programar_sondeo()
+
+    def _iniciar_hilo(self):
+        if self._hilo is None or not self._hilo.is_alive():
+            self._hilo = threading.Thread(target=self._trabajar, name="ColaGuardado", daemon=True)
+            self._hilo.start()
+
+    def _trabajar(self):
+        """Bucle del hilo de escritura"""
+        while True:
+            with self._condicion:
+                while not self._pendientes:
+                    self._condicion.wait()
+                (ruta, modo), (datos, callbacks) = self._pendientes.popitem(last=False)
+                self._en_curso += 1
+                self._escribiendo = ruta
+
+            error = None
+            try:
+                with cronometrar(f"persistencia.{modo}"):
+                    if modo == "anexar":
+                        anexar_sincronizado(ruta, datos)
+                    elif modo == "ejecutar":
+                        datos()
+                    else:
+                        escribir_atomico(ruta, datos)
+            except Exception as e:
+                error = e
+
+            if callbacks:
+                self._completados.put((callbacks, error))
+            elif error is not None:
+                log.error("Error guardando %s: %s", ruta, error)
+
+            with self._condicion:
+                self._en_curso -= 1
+                self._escribiendo = None
+                self._condicion.notify_all()
+
+    def _programar_sondeo(self):
+        """Arranca la consulta periódica de resultados en el hilo de Tk"""
+        if self._raiz is None or self._sondeo is not None:
+            return
+        try:
+            self._sondeo = self._raiz.after(self.INTERVALO_SONDEO, self._procesar_completados)
+        except Exception:
+            self._sondeo = None  # La ventana ya no existe
+
+    def _procesar_completados(self):
+        """Ejecuta los callbacks de las escrituras terminadas (hilo de Tk)"""
+        self._sondeo = None
+        self._ejecutar_callbacks()
+        with self._condicion:
+            ocupada = bool(self._pendientes) or self._en_curso > 0
+        if ocupada or not self._completados.empty():
+            self._programar_sondeo()
+
+    def _ejecutar_callbacks(self):
+        while True:
+            try:
+                callbacks, error = self._completados.get_nowait()
+            except queue.Empty:
+                return
+            for callback in callbacks:
+                try:
+                    callback(error)
+                except Exception:
+                    log.exception("Error en la confirmación de guardado")
+
+    def cancelar(self, ruta):
+        """Descarta las escrituras pendientes de una ruta (o de los archivos dentro de ella)
+
+        Se usa antes de borrar: si la ruta se está escribiendo en ese momento,
+        espera a que termine para que el borrado no llegue antes. Los callbacks
+        de las escrituras descartadas no se ejecutan.
+        """
+        ruta = os.path.abspath(ruta)
+        afectada = lambda otra: otra == ruta or otra.startswith(ruta + os.sep)
+        with self._condicion:
+            for clave in [clave for clave in self._pendientes if afectada(clave[0])]:
+                del self._pendientes[clave]
+            self._condicion.wait_for(
+                lambda: self._escribiendo is None or not afectada(self._escribiendo)
+            )
+
+    def vaciar(self, timeout=None):
+        """Espera a que terminen todas las escrituras pendientes (al salir)"""
+        with self._condicion:
+            return self._condicion.wait_for(
+                lambda: not self._pendientes and self._en_curso == 0,
+                timeout=timeout
+            )
+
+
+# Cola única del proceso, compartida por todos los módulos
+cola_guardado = ColaGuardado()
+atexit.register(cola_guardado.vaciar)